@@ -0,0 +1,49 @@
+"""
+Per-call overhead of small arithmetic graphs
+  assigns the Variable and evaluates, incrementally and not, against calling
+  the compiled function of the graph (Operator.compile) with the value
+
+usage: python -m benchmarks.bench_compile
+"""
+import timeit
+import nodeflow as nf
+
+
+def arithmetic(size:int, x:nf.Variable)->nf.Operator:
+    """alternating Plus, Minus, Multiply and Divide reading the variable, size nodes in total"""
+    ops = [nf.Plus, nf.Minus, nf.Multiply, nf.Divide]
+    op = nf.Plus(x, nf.Constant(1))
+    for i in range((size-3)//2):
+        op = ops[i % 4](op, nf.Constant(1.0 + i % 3))
+    return op
+
+
+def bench(size:int, number:int):
+    x = nf.Variable(1.0)
+    root = arithmetic(size, x)
+    f = root.compile()
+
+    def incremental():
+        x.value += 1
+        return root.evaluate()
+
+    def full():
+        x.value += 1
+        return root.evaluate(incremental=False)
+
+    values = iter(range(10**9))
+    compiled = lambda: f(next(values))
+
+    t_incremental = timeit.timeit(incremental, number=number) / number
+    t_full = timeit.timeit(full, number=number) / number
+    t_compiled = timeit.timeit(compiled, number=number) / number
+    print(f"{len(root.plan()):>6} nodes | evaluate(): {t_incremental*1e6:10.1f}us "
+          f"| evaluate(incremental=False): {t_full*1e6:10.1f}us "
+          f"| compiled: {t_compiled*1e6:10.1f}us | speedup: {t_incremental/t_compiled:5.1f}x")
+
+
+if __name__ == "__main__":
+    bench(10, number=10000)
+    bench(100, number=2000)
+    bench(1000, number=200)
+    bench(10000, number=20)
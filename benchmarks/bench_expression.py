@@ -0,0 +1,45 @@
+"""
+A blend with an offset on float32 frames
+  the numpy expression (a full frame temporary per term), against the Expression
+  operator compiled into row blocks
+
+usage: python -m benchmarks.bench_expression
+"""
+import time
+import tracemalloc
+import numpy as np
+import nodeflow as nf
+
+TEXT = "A*mix + B*(1-mix) + 0.1"
+
+
+def measure(f, number:int):
+    f() # warm up, compiles the expression
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(number):
+        result = f()
+    return result, (time.perf_counter()-start) / number, peak
+
+
+def bench(name:str, height:int, width:int, number:int=5):
+    rng = np.random.default_rng(0)
+    A = rng.random((height, width, 3), dtype=np.float32)
+    B = rng.random((height, width, 3), dtype=np.float32)
+    mix = 0.25
+    expression = nf.Expression(TEXT, A=nf.Constant(A), B=nf.Constant(B), mix=nf.Constant(mix))
+
+    expected, t_numpy, peak_numpy = measure(lambda: A*mix + B*(1-mix) + 0.1, number)
+    result, t_expression, peak_expression = measure(lambda: expression.evaluate(incremental=False), number)
+    error = np.abs(expected - result).max()
+    print(f"{name:>5} | numpy: {t_numpy*1e3:7.1f}ms peak {peak_numpy/2**20:6.1f}MB "
+          f"| Expression: {t_expression*1e3:7.1f}ms peak {peak_expression/2**20:6.1f}MB "
+          f"| speedup: {t_numpy/t_expression:4.2f}x | max error: {error:.1e}")
+
+
+if __name__ == "__main__":
+    bench("1080p", 1080, 1920)
+    bench("4K", 2160, 3840)
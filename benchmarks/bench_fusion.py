@@ -0,0 +1,52 @@
+"""
+Element wise chains on float32 frames
+  a Blend followed by per pixel math, evaluated operator by operator (a full frame
+  temporary each) against the fused kernel over row blocks (evaluate(fuse=True))
+
+usage: python -m benchmarks.bench_fusion
+"""
+import time
+import tracemalloc
+import numpy as np
+import nodeflow as nf
+from nodeflow.image import Blend
+
+
+def grade(A:nf.Operator, B:nf.Operator, mix:nf.Operator)->nf.Operator:
+    """blend, lift, gain, gamma-ish and offset"""
+    blend = Blend(A, B, mix)
+    lifted = nf.Plus(blend, nf.Constant(np.float32(0.05)))
+    gained = nf.Multiply(lifted, nf.Constant(np.float32(1.2)))
+    squared = nf.Multiply(gained, gained)
+    return nf.Minus(nf.Divide(squared, nf.Constant(np.float32(1.5))), nf.Constant(np.float32(0.01)))
+
+
+def measure(f, number:int):
+    f() # warm up
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(number):
+        result = f()
+    return result, (time.perf_counter()-start) / number, peak
+
+
+def bench(name:str, height:int, width:int, number:int=5):
+    rng = np.random.default_rng(0)
+    A = nf.Constant(rng.random((height, width, 3), dtype=np.float32))
+    B = nf.Constant(rng.random((height, width, 3), dtype=np.float32))
+    root = grade(A, B, nf.Variable(0.25))
+
+    unfused, t_unfused, peak_unfused = measure(lambda: root.evaluate(incremental=False), number)
+    fused, t_fused, peak_fused = measure(lambda: root.evaluate(incremental=False, fuse=True), number)
+    error = np.abs(unfused - fused).max()
+    print(f"{name:>5} | unfused: {t_unfused*1e3:7.1f}ms peak {peak_unfused/2**20:6.1f}MB "
+          f"| fused: {t_fused*1e3:7.1f}ms peak {peak_fused/2**20:6.1f}MB "
+          f"| speedup: {t_unfused/t_fused:4.2f}x | max error: {error:.1e}")
+
+
+if __name__ == "__main__":
+    bench("1080p", 1080, 1920)
+    bench("4K", 2160, 3840)
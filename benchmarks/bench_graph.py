@@ -0,0 +1,53 @@
+"""
+Size and traversal time of large graphs
+  memory per operator, the dict of lists graph against the compact CSR view,
+  and the passes running on the CSR view: plan build, structural keys, variable analysis
+
+usage: python -m benchmarks.bench_graph
+"""
+import sys
+import time
+import tracemalloc
+import nodeflow as nf
+from nodeflow.graph_helpers import CSRGraph
+
+
+def chain(size:int)->nf.Operator:
+    """a chain of Plus operators reading one Variable, size nodes in total"""
+    op = nf.Variable(1)
+    for i in range((size-1)//2):
+        op = nf.Plus(op, nf.Constant(i))
+    return op
+
+
+def dict_graph_nbytes(G)->int:
+    """the dict and its lists, the operators excluded"""
+    return sys.getsizeof(G) + sum(sys.getsizeof(sources) for sources in G.values())
+
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter()-start
+
+
+def bench(size:int):
+    tracemalloc.start()
+    root = chain(size)
+    per_operator = tracemalloc.get_traced_memory()[0] / size
+    tracemalloc.stop()
+
+    G, t_dict = timed(root.graph)
+    graph, t_csr = timed(lambda: CSRGraph.build(root))
+    plan, t_plan = timed(root.plan)
+    _, t_variables = timed(plan.variables)
+    _, t_key = timed(root.key)
+    print(f"{len(graph):>8} nodes | {per_operator:6.0f}B/operator "
+          f"| graph(): {t_dict*1e3:9.1f}ms {dict_graph_nbytes(G)/2**20:7.1f}MB "
+          f"| CSR: {t_csr*1e3:9.1f}ms {graph.nbytes/2**20:7.1f}MB "
+          f"| plan: {t_plan*1e3:9.1f}ms | variables: {t_variables*1e3:8.1f}ms | key: {t_key*1e3:9.1f}ms")
+
+
+if __name__ == "__main__":
+    for size in [1000, 10000, 100000, 1000000]:
+        bench(size)
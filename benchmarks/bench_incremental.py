@@ -0,0 +1,37 @@
+"""
+Scrubbing cost with incremental evaluation
+  a frame dependent branch of 10 nodes next to a frame invariant branch of
+  size nodes, changing the frame recomputes the frame branch only
+
+usage: python -m benchmarks.bench_incremental
+"""
+import timeit
+import nodeflow as nf
+from benchmarks.bench_plan import chain
+
+
+def bench(size:int, number:int):
+    frame = nf.Variable(0)
+    frame_branch = frame
+    for i in range(10):
+        frame_branch = nf.Plus(frame_branch, nf.Constant(1))
+    root = nf.Plus(frame_branch, chain(size))
+    root.evaluate()
+
+    def scrub():
+        frame.value += 1
+        root.evaluate()
+
+    def scrub_all():
+        frame.value += 1
+        root.evaluate(incremental=False)
+
+    incremental = timeit.timeit(scrub, number=number) / number
+    full = timeit.timeit(scrub_all, number=number) / number
+    print(f"{len(root.plan()):>8} nodes | incremental: {incremental*1e3:10.3f}ms | full: {full*1e3:10.3f}ms")
+
+
+if __name__ == "__main__":
+    bench(10, number=1000)
+    bench(1000, number=100)
+    bench(100000, number=3)
@@ -0,0 +1,63 @@
+"""
+Peak size of live intermediates of a wide image graph
+  every branch blends a 4K float32 frame with the mean of another one,
+  the dependency order holds both frames at once, the memory aware order one
+
+usage: python -m benchmarks.bench_memory
+"""
+import numpy as np
+import nodeflow as nf
+from nodeflow.plan import peak_nbytes
+
+
+class Frame(nf.Operator):
+    def __init__(self, seed:int):
+        super().__init__()
+        self.seed = seed
+
+    def __call__(self):
+        return np.full((2160, 3840, 4), self.seed, dtype=np.float32)
+
+    def estimate_nbytes(self, input_nbytes):
+        return 2160*3840*4*4
+
+
+class Mean(nf.Operator):
+    def __init__(self, img:nf.Operator):
+        super().__init__(img)
+
+    def __call__(self, img):
+        return img.mean(axis=(0, 1))
+
+    def estimate_nbytes(self, input_nbytes):
+        return 4*4
+
+
+class Blend(nf.Operator):
+    def __init__(self, A:nf.Operator, B:nf.Operator):
+        super().__init__(A, B)
+
+    def __call__(self, A, B):
+        return float((A*0.5 + B*0.5).mean())
+
+
+def wide(branches:int)->nf.Operator:
+    op = Blend(Frame(0), Mean(Frame(1)))
+    for i in range(1, branches):
+        op = nf.Plus(op, Blend(Frame(2*i), Mean(Frame(2*i+1))))
+    return op
+
+
+def bench(branches:int):
+    root = wide(branches)
+    plan = root.plan()
+    default = peak_nbytes(plan.sources, plan.consumers, plan.estimate_nbytes(), plan.outputs)
+    root.evaluate(incremental=False, low_memory=True)
+    low = root.plan(low_memory=True)
+    print(f"{branches:>3} branches | dependency order: {default/2**20:8.1f}MB "
+          f"| memory order predicted: {low.predicted_peak/2**20:8.1f}MB measured: {low.peak/2**20:8.1f}MB")
+
+
+if __name__ == "__main__":
+    bench(2)
+    bench(8)
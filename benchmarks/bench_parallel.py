@@ -0,0 +1,42 @@
+"""
+Thread pool evaluation speedup against worker count
+  independent GaussianBlur branches over one 1080p frame,
+  OpenCV is limited to a single thread so the speedup comes from the graph
+
+usage: python -m benchmarks.bench_parallel
+"""
+import os
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import nodeflow as nf
+from nodeflow.image import GaussianBlur, Blend
+
+
+def graph(branches:int):
+    source = nf.Constant(np.random.rand(1080, 1920, 3).astype(np.float32))
+    ops = [GaussianBlur(source) for b in range(branches)]
+    root = ops[0]
+    for op in ops[1:]:
+        root = Blend(root, op, nf.Constant(0.5))
+    return source, root
+
+
+def bench(source, root, executor, number:int):
+    def run():
+        source.invalidate() # recompute everything downstream
+        root.evaluate(executor=executor)
+    return timeit.timeit(run, number=number) / number
+
+
+if __name__ == "__main__":
+    cv2.setNumThreads(1)
+    source, root = graph(branches=8)
+    sequential = bench(source, root, None, number=3)
+    print(f"sequential: {sequential*1e3:8.1f}ms")
+    for workers in sorted({1, 2, 4, os.cpu_count()}):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            threaded = bench(source, root, executor, number=3)
+        print(f"{workers:>3} workers: {threaded*1e3:8.1f}ms | speedup: {sequential/threaded:4.2f}x")
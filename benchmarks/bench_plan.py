@@ -0,0 +1,34 @@
+"""
+Per-call overhead of Operator.evaluate
+  compares evaluating with the cached EvaluationPlan to rebuilding the plan
+  on every call (the behaviour before plans were compiled once per root)
+
+usage: python -m benchmarks.bench_plan
+"""
+import timeit
+import nodeflow as nf
+from nodeflow.plan import EvaluationPlan
+
+
+def chain(size:int)->nf.Operator:
+    """a chain of Plus operators with size nodes in total"""
+    one = nf.Constant(1)
+    op = one
+    for i in range((size-1)//2):
+        op = nf.Plus(op, nf.Constant(1))
+    return op
+
+
+def bench(size:int, number:int):
+    root = chain(size)
+    root.evaluate() # build plan
+
+    cached = timeit.timeit(lambda: root.evaluate(incremental=False), number=number) / number
+    rebuilt = timeit.timeit(lambda: EvaluationPlan(root).run_all(), number=number) / number
+    print(f"{len(root.plan()):>8} nodes | cached plan: {cached*1e3:10.3f}ms | rebuilt plan: {rebuilt*1e3:10.3f}ms | speedup: {rebuilt/cached:5.1f}x")
+
+
+if __name__ == "__main__":
+    bench(10, number=10000)
+    bench(1000, number=100)
+    bench(100000, number=3)
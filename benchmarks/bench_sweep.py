@@ -0,0 +1,78 @@
+"""
+Sweep of blur radius x blend mix x frame over a small image graph
+  assigning the Variables and evaluating every combination, against nodeflow.sweep
+  computing the blur once per radius and the frame once per frame, sequentially and on a pool
+
+usage: python -m benchmarks.bench_sweep
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import nodeflow as nf
+
+
+class Frame(nf.Operator):
+    def __init__(self, frame:nf.Operator):
+        super().__init__(frame)
+
+    def __call__(self, frame:int):
+        """a denoised frame: low pass in the frequency domain"""
+        noise = np.random.default_rng(frame).random((512, 512))
+        spectrum = np.fft.fft2(noise)
+        spectrum[32:-32, :] = 0
+        spectrum[:, 32:-32] = 0
+        return np.fft.ifft2(spectrum).real.astype(np.float32)
+
+
+class Blur(nf.Operator):
+    """a separable box blur of the source image, repeated for cost"""
+    def __init__(self, radius:nf.Operator):
+        super().__init__(radius)
+
+    def __call__(self, radius:int):
+        img = np.random.default_rng(0).random((512, 512), dtype=np.float32)
+        kernel = np.ones(2*radius+1, dtype=np.float32) / (2*radius+1)
+        for _ in range(4):
+            img = np.apply_along_axis(np.convolve, 0, img, kernel, mode="same")
+        return img
+
+
+class Mix(nf.Operator):
+    def __init__(self, A:nf.Operator, B:nf.Operator, mix:nf.Operator):
+        super().__init__(A, B, mix)
+
+    def __call__(self, A, B, mix:float):
+        return float((A*(1-mix) + B*mix).mean())
+
+
+def bench(radii, mixes, frames):
+    radius, mix, frame = nf.Variable(1), nf.Variable(0.0), nf.Variable(0)
+    root = Mix(Blur(radius), Frame(frame), mix)
+    values = {radius: radii, mix: mixes, frame: frames}
+    count = len(radii) * len(mixes) * len(frames)
+
+    start = time.perf_counter()
+    for r in radii:
+        for m in mixes:
+            for f in frames:
+                radius.value, mix.value, frame.value = r, m, f
+                root.evaluate()
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in nf.sweep(root, values):
+        pass
+    t_sweep = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        start = time.perf_counter()
+        for _ in nf.sweep(root, values, executor=pool):
+            pass
+        t_pool = time.perf_counter() - start
+    print(f"{count:>5} combinations | assign and evaluate: {t_loop*1e3:9.1f}ms "
+          f"| sweep: {t_sweep*1e3:8.1f}ms | on 4 threads: {t_pool*1e3:8.1f}ms | speedup: {t_loop/t_sweep:5.1f}x")
+
+
+if __name__ == "__main__":
+    bench(radii=[1, 2, 4], mixes=[0.0, 0.5, 1.0], frames=range(8))
+    bench(radii=[1, 2, 4, 8], mixes=np.linspace(0, 1, 5), frames=range(16))
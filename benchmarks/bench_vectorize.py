@@ -0,0 +1,36 @@
+"""
+Parameter sweeps over an arithmetic graph
+  assigning the Variable and evaluating once per value, against one vectorized
+  evaluation with the array of values (Operator.evaluate_vectorized)
+
+usage: python -m benchmarks.bench_vectorize
+"""
+import time
+import numpy as np
+import nodeflow as nf
+from benchmarks.bench_compile import arithmetic
+
+
+def bench(size:int, count:int):
+    x = nf.Variable(1.0)
+    root = arithmetic(size, x)
+    values = np.linspace(0, 1, count)
+
+    start = time.perf_counter()
+    for value in values:
+        x.value = value
+        root.evaluate()
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    root.evaluate_vectorized({x: values})
+    t_vectorized = time.perf_counter() - start
+    print(f"{len(root.plan()):>5} nodes x {count:>6} values | loop: {t_loop*1e3:10.1f}ms "
+          f"| vectorized: {t_vectorized*1e3:8.1f}ms | speedup: {t_loop/t_vectorized:7.1f}x")
+
+
+if __name__ == "__main__":
+    bench(10, 1000)
+    bench(10, 100000)
+    bench(100, 10000)
+    bench(1000, 1000)
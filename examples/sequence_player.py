@@ -58,7 +58,7 @@ class Window(QWidget):
         sequence_item = SequenceItem(sequence_pattern, self.frame)
         read = nf.Read(sequence_item)
         read_log = nf.Log(read, fmt="{timestamp}: read")
-        cached_read = nf.Cache(read_log)
+        cached_read = nf.Cache(read_log, store=nf.ResultCache(budget=2*1024**3))
         tex = nf.texture.ToTexture(cached_read)
         self.out = tex
 
@@ -1,4 +1,13 @@
-from .core import Operator, Constant, Variable, Cache, operator, Log
+from .core import Operator, Constant, Variable, Cache, Switch, operator, Log, evaluate_many
+from .storage import ResultCache
+from .context import EvaluationContext
+from .compiler import CompiledGraph
+from .vectorize import VectorizedEvaluation, FallbackWarning
+from .sweeps import Sweep, sweep
+from .expressions import Expression
+from .profiling import Profile
+from . import events
+from .executors import ProcessExecutor
 from .math import Plus, Minus, Multiply, Divide
 from .image import Read, Ramp
 
@@ -0,0 +1,62 @@
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+from .graph_helpers import Graph, CSRGraph, dependency_order
+from .core import Operator, Variable
+
+
+def variable_dependencies(G:Graph)->Dict[Any, FrozenSet[Variable]]:
+    """
+    Tag every node of a dependency graph with the Variables it depends on
+      G: {node: sources}, eg.: Operator.graph()
+    nodes tagged with the empty set are frame invariant: their results hold across variable changes
+    """
+    tags: Dict[Any, FrozenSet[Variable]] = dict()
+    untagged = lambda N: [S for S in G.get(N, ()) if S not in tags]
+    for start in G:
+        if start in tags:
+            continue
+        order, _ = dependency_order(start, dependencies=untagged)
+        for N in order:
+            own = frozenset([N]) if isinstance(N, Variable) else frozenset()
+            tags[N] = own.union(*(tags[S] for S in G.get(N, ())))
+    return tags
+
+
+def variable_masks(graph:CSRGraph)->Tuple[List[Variable], List[int]]:
+    """
+    Variable dependencies over a compact graph
+    returns the Variables, and for each node id a bit mask of the ones it depends on (bit i: variables[i])
+    """
+    variables: List[Variable] = []
+    masks: List[int] = []
+    for N, row in zip(graph.nodes, graph.rows()):
+        mask = 0
+        for j in row:
+            mask |= masks[j]
+        if isinstance(N, Variable):
+            mask |= 1 << len(variables)
+            variables.append(N)
+        masks.append(mask)
+    return variables, masks
+
+
+def from_mask(variables:List[Variable], mask:int)->FrozenSet[Variable]:
+    """the Variables of a bit mask, see variable_masks"""
+    return frozenset(var for bit, var in enumerate(variables) if mask >> bit & 1)
+
+
+def static_graph(root:Operator)->Graph:
+    """the dependency graph over the connected inputs(), including the sources of cache hits"""
+    G: Graph = dict()
+    queue = [root]
+    while queue:
+        N = queue.pop()
+        if N not in G:
+            G[N] = [S for S in N.inputs() if isinstance(S, Operator)]
+            queue += G[N]
+    return G
+
+
+def invariant(G:Graph)->List[Any]:
+    """the nodes of the graph that depend on no Variable"""
+    return [N for N, variables in variable_dependencies(G).items() if not variables]
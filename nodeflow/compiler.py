@@ -0,0 +1,113 @@
+from typing import Any, Dict, List, Set
+import inspect
+
+from . import plan as _plan
+from .plan import Thunk
+from .core import Operator, Variable, Cache
+
+
+_unset = object()
+
+class CompiledGraph:
+    """
+    A flat python function evaluating a root, generated from its plan
+      one call per operator in evaluation order, results held in local variables
+      variables: the Variables of the graph, the parameters of the function
+
+    usage:
+      f = root.compile()
+      f(2, 3)             # values of f.variables, the omitted ones read from the Variables
+      f.call({frame: 2})  # by Variable
+      print(f.source)
+
+    Skips the bookkeeping of evaluate(): the operators keep no output, nothing is cached,
+    and no event is emitted. Cache operators pass their source through, lazy inputs are
+    compiled into nested functions. The function is regenerated on structural change only.
+    """
+    def __init__(self, root:Operator):
+        self.root = root
+        self.version = None
+        self.order: List[Operator] = []
+        self.slots: List[List[int]] = []
+        self.update()
+
+    def update(self):
+        """regenerate the function if the structure of the graph changed"""
+        plan = self.root.plan(static=True)
+        if plan.order != self.order or plan.slots != self.slots:
+            self._generate(plan)
+        self.version = plan.version
+
+    def _generate(self, plan:_plan.EvaluationPlan):
+        order, slots = plan.order, plan.slots
+        for N in order:
+            if inspect.iscoroutinefunction(N.__call__):
+                raise TypeError(f"{N} is async and cannot be compiled, use evaluate_async")
+        variables, _ = plan.variable_masks()
+        names = [f"r{i}" for i in range(len(order))]
+        namespace: Dict[str, Any] = {"_unset": _unset, "Thunk": Thunk}
+        for k, var in enumerate(variables):
+            names[plan.index[var]] = f"v{k}"
+
+        def block(target:int, available:Set[int], indent:str)->List[str]:
+            """the lines computing the target, from the results available in the enclosing scope"""
+            needed = set()
+            stack = [target]
+            while stack:
+                i = stack.pop()
+                if i in needed or i in available:
+                    continue
+                needed.add(i)
+                lazy = order[i].lazy
+                stack += [j for pos, j in enumerate(slots[i]) if pos not in lazy]
+
+            lines = []
+            available = set(available)
+            for i in sorted(needed):
+                N = order[i]
+                if isinstance(N, Cache):
+                    names[i] = names[slots[i][0]]
+                    available.add(i)
+                    continue
+                args = []
+                for pos, j in enumerate(slots[i]):
+                    if pos in N.lazy:
+                        thunk = f"t{i}_{pos}"
+                        lines.append(f"{indent}def {thunk}():")
+                        lines += block(j, available, indent + "    ")
+                        lines.append(f"{indent}    return {names[j]}")
+                        args.append(f"Thunk({thunk})")
+                    else:
+                        args.append(names[j])
+                namespace[f"f{i}"] = N.__call__
+                lines.append(f"{indent}{names[i]} = f{i}({', '.join(args)}) # {N!r}")
+                available.add(i)
+            return lines
+
+        lines = [f"def compiled({', '.join(f'v{k}=_unset' for k in range(len(variables)))}):"]
+        for k, var in enumerate(variables):
+            i = plan.index[var]
+            namespace[f"f{i}"] = var.__call__
+            lines.append(f"    if v{k} is _unset: v{k} = f{i}() # {var!r}")
+        lines += block(plan.index[plan.root], set(plan.index[var] for var in variables), "    ")
+        lines.append(f"    return {names[plan.index[plan.root]]}")
+
+        self.source = "\n".join(lines)
+        exec(compile(self.source, f"<compiled {plan.root}>", "exec"), namespace)
+        self.function = namespace["compiled"]
+        self.variables: List[Variable] = variables
+        self.order, self.slots = order, slots
+
+    def __call__(self, *values)->Any:
+        if self.version != _plan._structure_version:
+            self.update()
+        return self.function(*values)
+
+    def call(self, overrides:Dict[Variable, Any])->Any:
+        """evaluate with {variable: value}, the others read from the Variables"""
+        if self.version != _plan._structure_version:
+            self.update()
+        return self.function(*(overrides.get(var, _unset) for var in self.variables))
+
+    def __repr__(self):
+        return f"CompiledGraph({self.root}, {len(self.order)} nodes)"
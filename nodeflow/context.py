@@ -0,0 +1,146 @@
+from typing import Any, Dict, List
+from types import MappingProxyType
+import threading
+
+from . import plan as _plan
+from . import events
+from .plan import EvaluationPlan, Thunk
+from .core import Operator, Variable, Cache, _missing
+
+
+class EvaluationContext:
+    """
+    Values of Variables to evaluate with, without assigning them
+      overrides: {variable: value}
+
+    Results depending on the overridden variables are computed and kept by the context,
+    the others are shared with the graph: clean outputs are used as they are, and
+    the rest is computed once for all contexts (see EvaluationPlan.shared).
+    A context can be evaluated from any thread, and several contexts of one graph concurrently,
+    their results are forgotten when an operator of the graphs they evaluated is invalidated.
+
+    usage: root.evaluate(overrides={frame: 42}), or root.evaluate(context=ctx) to keep the results
+    """
+    def __init__(self, overrides:Dict[Variable, Any]):
+        for var in overrides:
+            if not isinstance(var, Variable):
+                raise TypeError(f"only Variables can be overridden, got: {var!r}")
+        self.overrides = MappingProxyType(dict(overrides))
+        self.values: Dict[Operator, Any] = dict() # results computed in this context
+        self.keys: Dict[Operator, bytes] = dict() # structural keys in this context
+        self._generation = None # when the values were last known up to date
+        self._plans: Dict[Operator, EvaluationPlan] = dict() # the plans the values were computed by
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self.values.clear()
+            self.keys.clear()
+            self._generation = None
+            self._plans.clear()
+
+    def key(self, plan:EvaluationPlan, i:int)->bytes:
+        """the key of the i-th operator of the plan with the overridden values"""
+        order = plan.order
+        affected = plan.affected(self.overrides)
+        keys = self.keys
+        stack = [i]
+        while stack:
+            j = stack[-1]
+            N = order[j]
+            if N in keys:
+                stack.pop()
+            elif j not in affected:
+                keys[N] = N.key()
+                stack.pop()
+            elif N in self.overrides:
+                keys[N] = N.key_for(self.overrides[N])
+                stack.pop()
+            else:
+                missing = [k for k in plan.slots[j] if order[k] not in keys]
+                if missing:
+                    stack += missing
+                    continue
+                input_keys = [keys[order[k]] for k in plan.slots[j]]
+                # Cache: the source key, custom key functions see the shared graph only
+                keys[N] = input_keys[0] if isinstance(N, Cache) else N.digest_key(N.params(), input_keys)
+                stack.pop()
+        return keys[order[i]]
+
+    def evaluate(self, root:Operator, verbose=False)->Any:
+        """evaluate the root in this context, see Operator.evaluate(context=...)"""
+        plan = root.plan(verbose=verbose, static=True)
+        with self._lock:
+            self._plans[root] = plan
+            if self._generation is None or any(P.last_change() > self._generation for P in self._plans.values()):
+                self.values.clear()
+                self.keys.clear()
+                self._plans = {root: plan}
+            self._generation = _plan.generation
+            return self._run(plan, verbose)
+
+    def _run(self, plan:EvaluationPlan, verbose=False)->Any:
+        order = plan.order
+        affected = plan.affected(self.overrides)
+        values = self.values
+        shared = plan.shared()
+
+        # walk back from the roots, stopping at known results and cache hits
+        known: Dict[int, Any] = dict()
+        needed = set(plan.outputs)
+        schedule: List[int] = []
+        for i in reversed(range(len(order))):
+            if i not in needed:
+                continue
+            N = order[i]
+            if N in self.overrides:
+                known[i] = self.overrides[N]
+            elif i not in affected and not N._dirty:
+                known[i] = N._output
+            elif i not in affected and i in shared:
+                known[i] = shared[i]
+            elif N in values:
+                known[i] = values[N]
+            else:
+                if isinstance(N, Cache):
+                    key = self.key(plan, i)
+                    hit = N.store.get(key, _missing)
+                    if events.listening:
+                        events.emit(events.CacheMiss(N, key) if hit is _missing else events.CacheHit(N, key))
+                    if hit is not _missing:
+                        if verbose: print(f"  cached: {N}")
+                        known[i] = values[N] = hit
+                        continue
+                if N in plan.lazy: # evaluated on demand
+                    lazy = set(pos for pos, S in plan.lazy[N])
+                    needed.update(j for pos, j in enumerate(plan.slots[i]) if pos not in lazy)
+                else:
+                    needed.update(plan.sources[i])
+                schedule.append(i)
+
+        if verbose: print("\nEvaluate in context (in order:", [order[i] for i in reversed(schedule)], ")")
+        for i in reversed(schedule):
+            N = order[i]
+            if N in plan.lazy:
+                args = [known.get(j) for j in plan.slots[i]]
+                for pos, S in plan.lazy[N]:
+                    args[pos] = Thunk(lambda S=S: self._run(S.plan(static=True)))
+            else:
+                args = [known[j] for j in plan.slots[i]]
+            if verbose: print(f"  evaluate: {N}")
+            if isinstance(N, Cache):
+                value = args[0]
+                N.store.put(self.key(plan, i), value)
+            else:
+                value = events.call(N, args) if events.listening else N(*args)
+            known[i] = value
+            if i in affected:
+                values[N] = value
+            else:
+                shared[i] = value
+
+        outputs = [known[i] for i in plan.outputs]
+        return outputs if plan.batch else outputs[0]
+
+    def __repr__(self):
+        return "EvaluationContext({})".format(", ".join(f"{var!r}={value!r}" for var, value in self.overrides.items()))
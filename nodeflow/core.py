@@ -1,9 +1,18 @@
-from typing import Union, List, Dict, Any, Generator, Callable
+from typing import Union, List, Dict, Any, Generator, Callable, Iterable, Tuple
 from collections import OrderedDict
 from collections.abc import Hashable
 from collections import Counter
+from concurrent.futures import Executor
 import inspect
-import networkx as nx
+import weakref
+import threading
+import queue
+from . import plan as _plan
+from . import events
+from .plan import EvaluationPlan
+from .storage import ResultCache
+from .graph_helpers import CSRGraph
+from .hashing import digest, content_hash, function_hash
 
 
 class bcolors:
@@ -19,10 +28,37 @@ class bcolors:
 
 class Operator:
     namecounter = Counter()
+    dynamic_dependencies = False # dependencies may change between evaluations (eg.: Cache)
+    early_cutoff = None # compare recomputed outputs to the previous one: "identity", "equal" or "hash"
+    process_safe = False # may be evaluated in a worker process (see executors.ProcessExecutor)
+    concurrency = None # maximum concurrent calls of this class in evaluate_async
+    lazy = () # positions in inputs() passed as thunks, evaluated only when called (see Switch), async operators await the result
+    broadcast_safe = False # computes element wise on arrays of values (see evaluate_vectorized)
+    elementwise = False # each output element depends on the same elements of the inputs only, may be fused (see plan(fuse=True))
+    # subclasses without __slots__ get a __dict__ as usual
+    __slots__ = (
+        "args", "kwargs", "_name", "_plans", "_consumers", "_output", "_output_hash", "_version",
+        "_input_versions", "_modified", "_dirty", "_invalidated", "_key_digest", "_nbytes", "__weakref__"
+    )
     def __init__(self, *args, name:str=None, **kwargs):
         self.args = list(args)
         self.kwargs = kwargs
         self._name = self.make_unique_name(name or self.__class__.__name__)
+        self._plans = dict() # compiled plans of this root by kind, see plan()
+
+        # incremental evaluation: last output, and dirty when it is out of date
+        self._consumers = [] # weak references, lighter than a WeakSet per operator
+        self._output = None
+        self._output_hash = None
+        self._version = 0 # bumped when the output changes
+        self._input_versions = None # versions of the inputs the output was computed from
+        self._modified = False
+        self._dirty = False
+        self._invalidated = 0 # generation of the last invalidation, see EvaluationPlan.last_change
+        self._key_digest = None # memoized key()
+        self._nbytes = None # output size of the last low memory evaluation
+        self._connect(*self.inputs())
+        self.invalidate()
 
     @classmethod
     def copy(cls, op):
@@ -37,26 +73,106 @@ class Operator:
         self.signature = inspect.signature(self.__call__)
 
     def set_inputs(self, *args, **kwargs):
+        self._disconnect(*self.inputs())
         self.args = args
         self.kwargs = kwargs
+        self._connect(*self.inputs())
+        _plan.structure_changed()
+        self.invalidate()
+
+    def _connect(self, *inputs):
+        for dep in inputs:
+            if isinstance(dep, Operator):
+                refs = dep._consumers
+                refs.append(weakref.ref(self))
+                if len(refs) >= 8 and len(refs) & (len(refs)-1) == 0:
+                    dep.consumers() # forget the collected ones, amortized
+
+    def _disconnect(self, *inputs):
+        for dep in inputs:
+            if isinstance(dep, Operator):
+                dep._consumers = [ref for ref in dep._consumers if ref() not in (self, None)]
+
+    def consumers(self)->List["Operator"]:
+        consumers = [ref() for ref in self._consumers]
+        if None in consumers: # forget the collected ones
+            self._consumers = [ref for ref, C in zip(self._consumers, consumers) if C is not None]
+        return list(dict.fromkeys(C for C in consumers if C is not None))
+
+    def invalidate(self):
+        """mark this operator and everything downstream dirty, and forget their keys"""
+        _plan.graph_changed()
+        self._invalidated = _plan.generation # downstream plans hold this operator too
+        self._modified = True
+        queue = [self]
+        while queue:
+            N = queue.pop()
+            # downstream of a dirty node is already dirty, and without a key
+            if N._dirty and N._key_digest is None:
+                continue
+            if not N._dirty:
+                N._dirty = True
+                _plan.dirty_operators.add(N)
+            N._key_digest = None
+            for ref in N._consumers:
+                C = ref()
+                if C is not None:
+                    queue.append(C)
+
+    def is_dirty(self)->bool:
+        return self._dirty
+
+    def inputs(self)->List["Operator"]:
+        """the connected input operators"""
+        return [*self.args, *self.kwargs.values()]
 
     def dependencies(self)->Generator["Operator", None, None]:
-        for dep in self.args:
-            yield dep
+        """the inputs evaluated before this operator, all but the lazy ones"""
+        lazy = self.lazy
+        for i, dep in enumerate(self.inputs()):
+            if i not in lazy:
+                yield dep
+
+    def params(self)->tuple:
+        """parameters other than the inputs that the output depends on, part of the key"""
+        return ()
+
+    def needed(self, *args)->Iterable[int]:
+        """
+        positions of the lazy inputs a call will use given the other arguments, None when unknown
+        the known ones are evaluated ahead, concurrently with an executor (see EvaluationPlan.run)
+        """
+        return None
+
+    def estimate_nbytes(self, input_nbytes:List[int])->int:
+        """expected output size in bytes given the sizes of the inputs, None when unknown"""
+        return None
+
+    def key(self)->bytes:
+        """
+        Structural key: a digest of the class, parameters and input keys
+          memoized, and forgotten only when an input or a Variable upstream changes
+        """
+        if self._key_digest is None:
+            # compute the missing keys upstream first, without recursion
+            missing = lambda N: [S for S in N.inputs() if isinstance(S, Operator) and S._key_digest is None]
+            for N in CSRGraph.build(self, dependencies=missing).nodes:
+                N._key_digest = N.compute_key()
+        return self._key_digest
 
-        for dep in self.kwargs.values():
-            yield dep
+    def compute_key(self)->bytes:
+        return self.digest_key(self.params(), [S.key() for S in self.inputs()])
 
-    def key(self):
-        tuple(arg.key() for arg in self.args)
-        return (
-            self.__class__.__name__, 
-            tuple(arg.key() for arg in self.args),
-            tuple(arg.key() for arg in self.kwargs.values())
-        )
+    def merge_key(self, input_keys:List[bytes])->bytes:
+        """operators with equal merge keys are evaluated once by merging plans, see plan(merge=True)"""
+        return self.digest_key(self.params(), input_keys)
 
-    def __hash__(self):
-        return id(self)
+    def digest_key(self, params:tuple, input_keys:List[bytes])->bytes:
+        """the key of this operator with the given parameters and input keys"""
+        cls = self.__class__
+        return digest(cls.__module__, cls.__qualname__, params, *input_keys)
+
+    __hash__ = object.__hash__ # by identity
 
     def __call__(self)->Any:
         return None
@@ -88,46 +204,168 @@ class Operator:
 
         return G
 
-    def evaluate(self, verbose=False):
-        """Evaluate Graph"""
-        # if verbose: print("==EVALUATE GRAPH==\n==================\n")
-
-        #if verbose: print("Create Graph (dependency)\n------------")
-        G = self.graph(verbose=verbose)
-        G1 = nx.to_dict_of_lists(nx.DiGraph(G).reverse())
-
-        # Evaluate nodes in order
-        # if verbose: print("Evaluate Nodes\n--------------")
-        evaluation_order = list(reversed(list(nx.topological_sort(nx.DiGraph(G)))))
-        # if verbose: print("  in order:", evaluation_order)
-
-
-        # keep results as arguments
-        if verbose: print("\nEvaluate graph (in order:", evaluation_order, ")")
-        arguments = {N: list() for N in G.keys()}
-        for N in evaluation_order:
-            args = [n for n in reversed(arguments[N])]
-            if verbose: print(f"  evaluate: {N} with arguments: {args}")
-            value = N(*args) # evaluate node with arguments
-            if verbose:
-                print(f"    {N}({', '.join(repr(arg)[:10] for arg in args)}) => {repr(value)[:10]}")
-            del arguments[N] # delete results used for evaluation
-
-            # push results forward
-            for T in G1[N]:
-                arguments[T].append(value)
-        if verbose: print()
+    def plan(self, verbose=False, static=False, merge=False, low_memory=False, fuse=False)->EvaluationPlan:
+        """
+        the compiled evaluation plan of this root, rebuilt on structural change
+          static:     follow the connected inputs() instead of the dependencies() of this evaluation
+          merge:      evaluate structurally equal operators once, see EvaluationPlan.merged
+          low_memory: order to reduce the peak size of live intermediates, see EvaluationPlan.schedule_memory
+          fuse:       evaluate chains of element wise operators as one kernel, see EvaluationPlan.fused
+        """
+        kind = ("static" if static else "dynamic", merge, low_memory, fuse)
+        plan = self._plans.get(kind)
+        if plan is None or not plan.is_valid():
+            plan = EvaluationPlan(self, verbose=verbose, static=static, merge=merge, low_memory=low_memory, fuse=fuse)
+            self._plans[kind] = plan
+        return plan
+
+    def evaluate(self, verbose=False, incremental=True, executor:Executor=None, overrides:Dict["Variable", Any]=None, context:"EvaluationContext"=None, merge=False, low_memory=False, fuse=False):
+        """
+        Evaluate Graph
+          incremental: recompute dirty operators only, and keep their outputs for the next evaluation
+                       otherwise evaluate every operator, releasing intermediates as soon as possible
+          executor:    evaluate independent operators concurrently, eg.: a ThreadPoolExecutor
+                       (incremental evaluation only)
+          overrides:   {variable: value} to evaluate with, the variables themselves are left untouched
+          context:     an EvaluationContext to evaluate in, keeping its results for the next evaluation
+          merge:       evaluate operators with equal structural keys once (common subexpressions)
+          low_memory:  order to reduce the peak size of live intermediates (non incremental evaluation only),
+                       the predicted and actual peaks are reported by the plan: plan(low_memory=True).peak
+          fuse:        evaluate chains of element wise operators as one kernel over row blocks of the frames,
+                       without full frame intermediates (non incremental evaluation only)
+        """
+        if overrides is not None or context is not None:
+            from .context import EvaluationContext
+            if context is None:
+                context = EvaluationContext(overrides)
+            elif overrides is not None:
+                raise ValueError("pass either overrides or a context")
+            if executor is not None or not incremental:
+                raise ValueError("a context is evaluated incrementally on the calling thread")
+            return context.evaluate(self, verbose=verbose)
+
+        plan = self.plan(verbose=verbose, merge=merge, low_memory=low_memory, fuse=fuse)
+        if incremental:
+            if low_memory:
+                raise ValueError("low_memory requires non incremental evaluation, incremental keeps every output")
+            if fuse:
+                raise ValueError("fuse requires non incremental evaluation, fused operators keep no output")
+            return plan.run(verbose=verbose, executor=executor)
+        if executor is not None:
+            raise ValueError("an executor requires incremental evaluation")
+        return plan.run_all(verbose=verbose)
+
+    def evaluate_range(self, variable:"Variable", frames:Iterable, readahead:int=0, executor:Executor=None)->Generator[Tuple[Any, Any], None, None]:
+        """
+        Lazily evaluate the graph for each value of the variable, yielding (frame, result)
+          the compiled plan is reused, and frame invariant results are kept across frames
+          readahead: evaluate up to this many frames ahead on a background thread,
+                     while the caller consumes the earlier results. The graph must not be
+                     evaluated elsewhere while iterating.
+        """
+        if readahead <= 0:
+            for frame in frames:
+                variable.value = frame
+                yield frame, self.evaluate(executor=executor)
+            return
+
+        results = queue.Queue(maxsize=readahead) # bounds the frames held in memory
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def render():
+            try:
+                for frame in frames:
+                    variable.value = frame
+                    if not put((frame, self.evaluate(executor=executor))):
+                        return
+            except BaseException as err:
+                put(err)
+            else:
+                put(done)
+
+        thread = threading.Thread(target=render, name=f"{self}.evaluate_range", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+                del item
+        finally:
+            stop.set()
+            thread.join()
+
+    async def evaluate_async(self, verbose=False):
+        """
+        Evaluate Graph on the running event loop
+          operators may define async __call__, independent ones are awaited concurrently
+          and sync operators are offloaded to a thread, see Operator.concurrency for limits
+        """
+        return await self.plan(verbose=verbose).run_async(verbose=verbose)
 
-        # arguments shoud be empty now
-        assert(len(arguments)==0)
+    def evaluate_vectorized(self, overrides:Dict["Variable", Any], verbose=False)->"np.ndarray":
+        """
+        Evaluate the graph for N values of the variables in one pass, returning the N results
+          overrides: {variable: array of N values}, see VectorizedEvaluation
+        """
+        from .vectorize import VectorizedEvaluation
+        return VectorizedEvaluation(self, overrides).evaluate(verbose=verbose)
 
-        # return the last evaluated value
-        return value
+    def compile(self)->"CompiledGraph":
+        """
+        a flat python function evaluating this graph without the per node bookkeeping of evaluate()
+        the Variables are its parameters, see CompiledGraph
+        """
+        from .compiler import CompiledGraph
+        compiled = self._plans.get("compiled")
+        if compiled is None:
+            compiled = self._plans["compiled"] = CompiledGraph(self)
+        else:
+            compiled.update()
+        return compiled
+
+
+def evaluate_many(roots:List[Operator], verbose=False, incremental=True, executor:Executor=None, merge=False)->List[Any]:
+    """
+    Evaluate several roots with a single combined plan
+      operators shared between the roots are evaluated once, the results are returned in request order
+      merge: structurally equal operators too, see Operator.evaluate
+      non incremental: intermediates are released once all their consumers in the batch are done
+    """
+    roots = list(roots)
+    if not roots:
+        return []
+    owner = roots[0]
+    plan = owner._plans.get("batch")
+    if plan is None or plan.roots != roots or plan.merge != merge or not plan.is_valid():
+        plan = EvaluationPlan(roots, verbose=verbose, merge=merge)
+        owner._plans["batch"] = plan
+
+    if incremental:
+        return plan.run(verbose=verbose, executor=executor)
+    if executor is not None:
+        raise ValueError("an executor requires incremental evaluation")
+    return plan.run_all(verbose=verbose)
 
 
 def operator(f, name=None):
     # print("make operator from function", f.__name__)
+    function = function_hash(f) # the captured values at decoration time
     class Op(Operator):
+        __slots__ = ()
         def __init__(self, *args, **kwargs):
             assert all(isinstance(arg, Operator) for arg in args)
             assert all(isinstance(arg, Operator) for arg in kwargs.values())
@@ -135,78 +373,171 @@ def operator(f, name=None):
             # self._f = f
             # print("SET operator name to:", self._name)
 
-        def __call__(self, *args, **kwags):
-            return f(*args, **kwags)
-
+        def params(self):
+            return (function,)
+
+        if inspect.iscoroutinefunction(f):
+            async def __call__(self, *args, **kwags):
+                return await f(*args, **kwags)
+        else:
+            def __call__(self, *args, **kwags):
+                return f(*args, **kwags)
+
+    # identify the operator by its function (keys): functions sharing a qualname,
+    # eg.: closures of one factory, differ by their code and captured values
+    Op.__module__ = f.__module__
+    Op.__name__ = f.__name__
+    Op.__qualname__ = f.__qualname__
     return Op
 
 
 class Constant(Operator):
-    def __init__(self, value, name=None):
+    """
+    A constant value, keyed by its content so equal values share cache entries
+      sample: hash at most this many bytes of large arrays (see hashing.sampled_hash)
+    """
+    __slots__ = ("sample", "_value")
+    def __init__(self, value, name=None, sample:int=None):
         super().__init__(name=name)
-        self.value = value
+        self.sample = sample
+        self._value = value
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self.invalidate()
 
     def __call__(self):
-        return self.value
+        return self._value
 
-    def key(self):
-        return id(self.value)
+    def params(self):
+        return (content_hash(self._value, sample=self.sample),)
 
 
 class Variable(Operator):
+    early_cutoff = "equal"
+    __slots__ = ("_value",)
     def __init__(self, value):
         super().__init__()
         assert isinstance(value, Hashable)
-        self.value = value
+        self._value = value
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self.invalidate()
 
     def __call__(self):
-        return self.value
+        return self._value
+
+    def params(self):
+        return (content_hash(self._value),)
+
+    def merge_key(self, input_keys:List[bytes])->bytes:
+        return digest(id(self)) # independent variables are never merged, even when equal
 
-    def key(self):
-        return ("var", self.value)
+    def key_for(self, value)->bytes:
+        """the key of this variable if it had the value"""
+        return self.digest_key((content_hash(value),), [])
 
     def __str__(self):
         return str(self.value)
 
 
+_missing = object()
+
 class Cache(Operator):
-	def __init__(self, source:Operator, key:Callable=None):
+	"""
+	Skip evaluating the source when its result is cached
+	  key:   optional function of the source returning the cache key, defaults to source.key()
+	  store: ResultCache backend, pass the same store to share a memory budget between Cache operators
+	"""
+	dynamic_dependencies = True
+	__slots__ = ("source", "_key", "store", "_lookup_key", "_hit")
+	def __init__(self, source:Operator, key:Callable=None, store:ResultCache=None):
+		self.source = source # required by __hash__
 		super().__init__()
-		if key is None:
-			key = lambda s: hash(s)
-
-		self.source = source
-		self._key = key
-		if not self._key is None:
-			self._key = lambda: source.key()
-
+		self._key = key or (lambda source: source.key())
+		self.store = store if store is not None else ResultCache()
 
-		self.cache = dict()
+		# the lookup of the pending evaluation
+		self._lookup_key = _missing
+		self._hit = _missing
 
 	def __hash__(self):
 		return hash( ("Cache", self.source) )
 
+	def _lookup(self):
+		key = self.key()
+		if key != self._lookup_key: # look up once per evaluation
+			self._lookup_key = key
+			self._hit = self.store.get(key, _missing)
+			if events.listening:
+				events.emit(events.CacheMiss(self, key) if self._hit is _missing else events.CacheHit(self, key))
+		return key
+
+	def inputs(self):
+		return [self.source]
+
 	def dependencies(self):
-		if self.source.key() not in self.cache:
+		if not self._dirty: # not evaluated: check the store without counting, nor holding the value
+			return [] if self.key() in self.store else [self.source]
+		self._lookup()
+		if self._hit is _missing:
 			return [self.source]
 		else:
 			return []
 
-	def __call__(self, value=None):
-		if value is not None:
-			key = self.source.key()
-			self.cache[key] = value
-		return self.cache[self.source.key()]
+	def __call__(self, value=_missing):
+		key = self._lookup()
+		if value is _missing:
+			value = self._hit
+		else:
+			self.store.put(key, value)
+		self._lookup_key = self._hit = _missing
+		return value
+
+	def compute_key(self):
+		return self._key(self.source)
+
+class Switch(Operator):
+    """
+    Select one of the inputs by index, the others are not evaluated
+      Switch(index, A, B, ...)
+    """
+    __slots__ = ()
+    def __init__(self, index:Operator, *inputs:Operator, name=None):
+        super().__init__(index, *inputs, name=name)
+
+    @property
+    def lazy(self):
+        return range(1, len(self.args))
+
+    def needed(self, index:int):
+        return (index+1,)
+
+    def __call__(self, index:int, *inputs:Callable[[], Any]):
+        return inputs[index]()
 
-	def key(self):
-		return self._key()
 
 import datetime
 class Log(Operator):
+    __slots__ = ("fmt",)
     def __init__(self, value:Operator, fmt:str="{timestamp} {value}", name=None):
         super().__init__(value, name=name)
         self.fmt = fmt
 
+    def params(self):
+        return (self.fmt,)
+
     def __call__(self, value):
         print(self.fmt.format(timestamp=str(datetime.datetime.now()), value=value))
         return value
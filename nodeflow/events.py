@@ -0,0 +1,166 @@
+"""
+Evaluation events
+  listeners subscribe to event classes, Event for all of them:
+
+    unsubscribe = events.subscribe(print, events.NodeFinished, events.NodeError)
+    root.evaluate()
+    unsubscribe()
+
+  listeners are called on the thread emitting the event, and must be thread-safe
+  when evaluating with an executor or contexts. Without listeners no event is built.
+"""
+
+from typing import Any, Callable, Dict, Tuple
+from dataclasses import dataclass
+import os
+import threading
+import time
+
+
+@dataclass
+class Event:
+    pass
+
+
+@dataclass
+class PlanBuilt(Event):
+    plan: Any
+
+    def __str__(self):
+        return f"plan built: {self.plan.root} ({len(self.plan)} nodes)"
+
+
+@dataclass
+class NodeStarted(Event):
+    node: Any
+    thread: str
+
+    def __str__(self):
+        return f"started: {self.node} on {self.thread}"
+
+
+@dataclass
+class NodeFinished(Event):
+    node: Any
+    value: Any
+    start: float # seconds, perf_counter
+    wall: float # seconds
+    cpu: float # thread cpu seconds, None when not measured on the calling thread
+    thread: str
+    pid: int
+
+    def __str__(self):
+        return f"finished: {self.node} in {self.wall*1e3:.3f}ms => {repr(self.value)[:10]}"
+
+
+@dataclass
+class NodeError(Event):
+    node: Any
+    error: BaseException
+
+    def __str__(self):
+        return f"error: {self.node} raised {self.error!r}"
+
+
+@dataclass
+class CacheHit(Event):
+    cache: Any
+    key: Any
+
+    def __str__(self):
+        return f"cache hit: {self.cache}"
+
+
+@dataclass
+class CacheMiss(Event):
+    cache: Any
+    key: Any
+
+    def __str__(self):
+        return f"cache miss: {self.cache}"
+
+
+@dataclass
+class Eviction(Event):
+    store: Any
+    key: Any
+    nbytes: int
+
+    def __str__(self):
+        return f"evicted: {self.nbytes} bytes from {self.store}"
+
+
+@dataclass
+class Fallback(Event):
+    node: Any
+    size: int
+
+    def __str__(self):
+        return f"fallback: {self.node} evaluated per element ({self.size} times)"
+
+
+# checked by the evaluation before building any event
+listening = False
+
+_listeners: Dict[type, Tuple[Callable, ...]] = dict()
+_lock = threading.Lock()
+
+
+def subscribe(listener:Callable[[Event], None], *types:type)->Callable[[], None]:
+    """call the listener with the events of the types (all events by default), returns the unsubscribe function"""
+    global listening
+    types = types or (Event,)
+    with _lock:
+        for cls in types:
+            _listeners[cls] = _listeners.get(cls, ()) + (listener,)
+        listening = True
+    return lambda: unsubscribe(listener, *types)
+
+
+def unsubscribe(listener:Callable[[Event], None], *types:type):
+    global listening
+    types = types or (Event,)
+    with _lock:
+        for cls in types:
+            remaining = list(_listeners.get(cls, ()))
+            if listener in remaining:
+                remaining.remove(listener)
+            if remaining:
+                _listeners[cls] = tuple(remaining)
+            else:
+                _listeners.pop(cls, None)
+        listening = bool(_listeners)
+
+
+def emit(event:Event):
+    for cls in type(event).__mro__:
+        for listener in _listeners.get(cls, ()):
+            listener(event)
+
+
+def call(N, args)->Any:
+    """evaluate a node emitting NodeStarted, then NodeFinished or NodeError"""
+    thread = threading.current_thread().name
+    emit(NodeStarted(N, thread))
+    start, cpu = time.perf_counter(), time.thread_time()
+    try:
+        value = N(*args)
+    except BaseException as err:
+        emit(NodeError(N, err))
+        raise
+    emit(NodeFinished(N, value, start, time.perf_counter()-start, time.thread_time()-cpu, thread, os.getpid()))
+    return value
+
+
+async def call_async(N, args)->Any:
+    """await an async node emitting its events, the cpu time is not measured"""
+    thread = threading.current_thread().name
+    emit(NodeStarted(N, thread))
+    start = time.perf_counter()
+    try:
+        value = await N(*args)
+    except BaseException as err:
+        emit(NodeError(N, err))
+        raise
+    emit(NodeFinished(N, value, start, time.perf_counter()-start, None, thread, os.getpid()))
+    return value
@@ -0,0 +1,162 @@
+from typing import Any, List, Tuple
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+from dataclasses import dataclass
+import copy
+import os
+import threading
+import time
+
+import numpy as np
+
+from nodeflow.core import Operator
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """descriptor of an ndarray placed in shared memory"""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+@dataclass(frozen=True)
+class Timing:
+    """a call in a worker, see ProcessExecutor.submit_timed"""
+    start: float # seconds, perf_counter of the worker
+    wall: float # seconds
+    cpu: float # thread cpu seconds
+    thread: str
+    pid: int
+
+
+def share(value:Any, min_bytes:int)->Tuple[Any, List[shared_memory.SharedMemory]]:
+    """place a large array in a new shared memory block, returns the descriptor and the block"""
+    if not isinstance(value, np.ndarray) or value.nbytes < max(min_bytes, 1):
+        return value, []
+    shm = shared_memory.SharedMemory(create=True, size=value.nbytes)
+    np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)[...] = value
+    return SharedArray(shm.name, value.shape, value.dtype.str), [shm]
+
+
+def attach(value:Any)->Tuple[Any, List[shared_memory.SharedMemory]]:
+    """view a shared array descriptor as an ndarray, other values are returned as is"""
+    if not isinstance(value, SharedArray):
+        return value, []
+    shm = shared_memory.SharedMemory(name=value.name)
+    return np.ndarray(value.shape, dtype=np.dtype(value.dtype), buffer=shm.buf), [shm]
+
+
+def release(blocks:List[shared_memory.SharedMemory], unlink:bool):
+    for shm in blocks:
+        try:
+            shm.close()
+        except BufferError: # a view is still alive, the mapping goes with the process
+            pass
+        if unlink:
+            shm.unlink()
+
+
+def detach(op:Operator)->Operator:
+    """a copy of the operator without its graph and outputs, to ship to a worker"""
+    clone = copy.copy(op)
+    clone.args = []
+    clone.kwargs = {}
+    clone._consumers = None
+    clone._plans = dict()
+    clone._output = None
+    clone._output_hash = None
+    return clone
+
+
+def _call_in_worker(op:Operator, args:List[Any], min_bytes:int, timed:bool=False)->Any:
+    blocks = []
+    try:
+        views = []
+        for arg in args:
+            view, shms = attach(arg)
+            views.append(view)
+            blocks += shms
+        start, cpu = time.perf_counter(), time.thread_time()
+        value = op(*views)
+        timing = Timing(start, time.perf_counter()-start, time.thread_time()-cpu, threading.current_thread().name, os.getpid())
+        del views
+        # copy out of the arguments' blocks, the value may be a view
+        result, shms = share(value, min_bytes)
+        if shms:
+            release(shms, unlink=False) # the parent unlinks
+        elif isinstance(value, np.ndarray):
+            result = np.array(value)
+        del value
+        return (result, timing) if timed else result
+    finally:
+        release(blocks, unlink=False)
+
+
+class ProcessExecutor(Executor):
+    """
+    Evaluate process-safe operators in a process pool, and the rest locally
+
+    Operators declare themselves process-safe with the class attribute process_safe = True,
+    they are copied to the workers without their graph, so they must be picklable
+    (defined at module level). numpy arrays of at least min_shared_bytes are moved through
+    multiprocessing.shared_memory instead of being pickled.
+    Other operators run on the local executor (a thread pool by default).
+
+    usage: root.evaluate(executor=ProcessExecutor())
+    """
+    def __init__(self, max_workers:int=None, local:Executor=None, min_shared_bytes:int=1<<16):
+        resource_tracker.ensure_running() # shared with the workers, blocks are tracked once
+        self.pool = ProcessPoolExecutor(max_workers=max_workers)
+        self.local = local if local is not None else ThreadPoolExecutor()
+        self.min_shared_bytes = min_shared_bytes
+
+    def ships(self, fn)->bool:
+        """whether a call is sent to the process pool"""
+        return isinstance(fn, Operator) and fn.process_safe and not fn.lazy # thunks stay with the graph
+
+    def submit(self, fn, *args, **kwargs)->Future:
+        if not self.ships(fn) or kwargs:
+            return self.local.submit(fn, *args, **kwargs)
+        return self._ship(fn, args, timed=False)
+
+    def submit_timed(self, op:Operator, *args)->Future:
+        """ship a call to the pool, the result is the value and the Timing of the call in the worker"""
+        return self._ship(op, args, timed=True)
+
+    def _ship(self, fn, args, timed:bool)->Future:
+        blocks = []
+        shipped = []
+        try:
+            for arg in args:
+                value, shms = share(arg, self.min_shared_bytes)
+                shipped.append(value)
+                blocks += shms
+            remote = self.pool.submit(_call_in_worker, detach(fn), shipped, self.min_shared_bytes, timed)
+        except BaseException:
+            release(blocks, unlink=True)
+            raise
+
+        future = Future()
+        def done(remote:Future):
+            release(blocks, unlink=True)
+            try:
+                result = remote.result()
+                if timed:
+                    result, timing = result
+                if isinstance(result, SharedArray):
+                    view, shms = attach(result)
+                    value = np.array(view)
+                    del view
+                    release(shms, unlink=True)
+                    result = value
+            except BaseException as err:
+                future.set_exception(err)
+            else:
+                future.set_result((result, timing) if timed else result)
+        remote.add_done_callback(done)
+        return future
+
+    def shutdown(self, wait:bool=True, **kwargs):
+        self.pool.shutdown(wait=wait)
+        self.local.shutdown(wait=wait)
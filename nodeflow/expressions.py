@@ -0,0 +1,231 @@
+from typing import Any, Callable, Dict, List, Tuple
+import ast
+import operator
+import threading
+import numpy as np
+
+from .core import Operator
+from . import fusion
+
+
+# the functions an expression may call, all take out=
+FUNCTIONS: Dict[str, Callable] = {
+    "abs": np.absolute, "sqrt": np.sqrt, "exp": np.exp, "log": np.log,
+    "sin": np.sin, "cos": np.cos, "tan": np.tan, "floor": np.floor, "ceil": np.ceil,
+    "minimum": np.minimum, "maximum": np.maximum, "clip": np.clip
+}
+
+# the number of arguments of the functions, 1 otherwise
+ARITY: Dict[str, int] = {"minimum": 2, "maximum": 2, "clip": 3}
+
+_BINARY = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide, ast.Pow: np.power}
+_UNARY = {ast.USub: np.negative, ast.UAdd: np.positive}
+# scalars follow python arithmetic, python numbers stay weakly typed against arrays
+_SCALAR = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.Pow: operator.pow, ast.USub: operator.neg, ast.UAdd: operator.pos
+}
+
+
+def parse(text:str, names:List[str])->ast.expr:
+    """the syntax tree of the expression, only arithmetic, numbers, the input names and FUNCTIONS are allowed"""
+    try:
+        tree = ast.parse(text, mode="eval").body
+    except SyntaxError as err:
+        raise ValueError(f"invalid expression {text!r}: {err.msg}")
+    called = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            continue
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+            continue
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            continue
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            if id(node) in called:
+                continue # checked with its call
+            if node.id in FUNCTIONS and node.id not in names:
+                raise ValueError(f"function {node.id!r} is not called in {text!r}")
+            if node.id not in names:
+                raise ValueError(f"unknown name {node.id!r} in {text!r}, the inputs are: {', '.join(names)}")
+            continue
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+            arity = ARITY.get(node.func.id, 1)
+            if len(node.args) != arity:
+                raise ValueError(f"{node.func.id} takes {arity} argument{'s' if arity > 1 else ''}, got {len(node.args)} in {text!r}")
+            continue
+        if isinstance(node, (ast.operator, ast.unaryop, ast.expr_context)):
+            continue
+        raise ValueError(f"unsupported syntax in {text!r}: {ast.unparse(node)}")
+    return tree
+
+
+def kind(value:Any)->Tuple[bool, Any]:
+    """whether the value is split into row blocks (arrays), and its dtype: the compiled kernels are cached by these"""
+    if isinstance(value, np.ndarray) and value.ndim > 0:
+        return True, value.dtype
+    if isinstance(value, (np.ndarray, np.generic)):
+        return False, value.dtype
+    return False, type(value)
+
+
+class Kernel:
+    """
+    A compiled expression for inputs of given kinds, see Expression
+      scalar subexpressions are computed once, the others row block by row block with ufuncs
+      writing into block sized buffers (reused as soon as consumed) and into the output
+    """
+    def __init__(self, text:str, tree:ast.expr, names:List[str], kinds:List[Tuple[bool, Any]]):
+        self.text = text
+        self.names = names
+        called = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+        used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and id(node) not in called}
+        self.used: List[int] = [k for k, name in enumerate(names) if name in used] # the inputs setting the shape
+
+        # the dtype and arrayness of every node, from a one element sample of each input
+        samples = {
+            name: np.ones(1, dtype) if array else (dtype.type(1) if isinstance(dtype, np.dtype) else dtype(1))
+            for name, (array, dtype) in zip(names, kinds)
+        }
+        arrays = {name for name, (array, _) in zip(names, kinds) if array}
+        info: Dict[int, Tuple[bool, np.dtype]] = dict()
+        def probe(node):
+            if isinstance(node, ast.Constant):
+                value, array = node.value, False
+            elif isinstance(node, ast.Name):
+                value, array = samples[node.id], node.id in arrays
+            else:
+                children = [node.left, node.right] if isinstance(node, ast.BinOp) else [node.operand] if isinstance(node, ast.UnaryOp) else node.args
+                values = [probe(child) for child in children]
+                array = any(info[id(child)][0] for child in children)
+                value = self._function(node, array)(*values)
+            info[id(node)] = (array, np.asarray(value).dtype)
+            return value
+        with np.errstate(all="ignore"):
+            probe(tree)
+        self.array, self.dtype = info[id(tree)]
+
+        # generate: scalar nodes before the loop, array nodes per block
+        namespace: Dict[str, Any] = {"np": np}
+        scalar_lines: List[str] = []
+        block_lines: List[str] = []
+        dtypes: Dict[str, np.dtype] = dict() # the block sized buffers
+        free: Dict[np.dtype, List[str]] = dict()
+
+        def emit(node, target:str=None)->Tuple[str, str]:
+            """the code of the node's value, and the buffer it occupies"""
+            if isinstance(node, ast.Constant):
+                return repr(node.value), None
+            if isinstance(node, ast.Name):
+                k = names.index(node.id)
+                return (f"b{k}" if node.id in arrays else f"i{k}"), None
+            children = [node.left, node.right] if isinstance(node, ast.BinOp) else [node.operand] if isinstance(node, ast.UnaryOp) else node.args
+            array, dtype = info[id(node)]
+            function = f"u{len(namespace)}"
+            namespace[function] = self._function(node, array)
+            codes = [emit(child) for child in children]
+            args = ", ".join(code for code, _ in codes)
+            if not array:
+                value = f"s{len(scalar_lines)}"
+                scalar_lines.append(f"    {value} = {function}({args})")
+                return value, None
+            for _, buffer in codes: # consumed: reusable, also for the result
+                if buffer is not None:
+                    free.setdefault(dtypes[buffer], []).append(buffer)
+            buffer = None
+            if target is None:
+                if free.get(dtype):
+                    buffer = free[dtype].pop()
+                else:
+                    buffer = f"t{len(dtypes)}"
+                    dtypes[buffer] = dtype
+                target = f"{buffer}[:n]"
+            block_lines.append(f"        {function}({args}, out={target})")
+            return target, buffer
+
+        if self.array:
+            root, _ = emit(tree, target="out[start:stop]")
+            if isinstance(tree, (ast.Name, ast.Constant)):
+                block_lines.append(f"        out[start:stop] = {root}")
+        else:
+            root, _ = emit(tree)
+
+        params = ", ".join(f"i{k}" for k in range(len(names)))
+        lines = [f"def kernel(out, step, sliced, {params}):"] + scalar_lines
+        if self.array:
+            for target, dtype in dtypes.items():
+                namespace[f"d_{target}"] = dtype
+                lines.append(f"    {target} = np.empty((step,) + out.shape[1:], dtype=d_{target})")
+            lines.append("    for start in range(0, out.shape[0], step):")
+            lines.append("        stop = min(start+step, out.shape[0])")
+            lines.append("        n = stop-start")
+            for k in self.used:
+                if names[k] in arrays:
+                    lines.append(f"        b{k} = i{k}[start:stop] if sliced[{k}] else i{k}")
+            lines += block_lines
+            lines.append("    return out")
+        else:
+            lines.append(f"    return {root}")
+        self.source = "\n".join(lines)
+        exec(compile(self.source, f"<expression {text}>", "exec"), namespace)
+        self.function = namespace["kernel"]
+
+    @staticmethod
+    def _function(node:ast.expr, array:bool)->Callable:
+        if isinstance(node, ast.Call):
+            return FUNCTIONS[node.func.id]
+        op = type(node.op)
+        if not array:
+            return _SCALAR[op]
+        return _BINARY[op] if isinstance(node, ast.BinOp) else _UNARY[op]
+
+    def __call__(self, *values)->Any:
+        if not self.array:
+            return self.function(None, None, None, *values)
+        shape = np.broadcast_shapes(*(np.shape(values[k]) for k in self.used))
+        # arrays of the full rank and height are split by rows, the others broadcast
+        sliced = [np.ndim(value) == len(shape) and np.shape(value)[0] == shape[0] for value in values]
+        out = np.empty(shape, dtype=self.dtype)
+        row_nbytes = max(out.nbytes // max(shape[0], 1), 1)
+        step = max(1, fusion.BLOCK_NBYTES // row_nbytes)
+        with np.errstate(all="ignore"):
+            return self.function(out, step, sliced, *values)
+
+
+_kernels: Dict[Tuple, Kernel] = dict()
+_lock = threading.Lock()
+
+def compiled(text:str, tree:ast.expr, names:List[str], values:List[Any])->Kernel:
+    """the kernel of the expression for the kinds of the values, compiled once per expression text and dtypes"""
+    kinds = [kind(value) for value in values]
+    key = (text, tuple(names), tuple(kinds))
+    kernel = _kernels.get(key)
+    if kernel is None:
+        kernel = Kernel(text, tree, names, kinds)
+        with _lock:
+            kernel = _kernels.setdefault(key, kernel)
+    return kernel
+
+
+class Expression(Operator):
+    """
+    Pixel maths from a string over named inputs
+      Expression("A*mix + B*(1-mix) + 0.1", A=read, B=ramp, mix=Constant(0.5))
+
+    arithmetic (+ - * / **), numbers, the inputs and the FUNCTIONS (eg.: sqrt, clip) are allowed.
+    The string is parsed once, and compiled into a kernel per expression text and input dtypes:
+    image sized terms are computed row block by row block into reused buffers and the output,
+    without full frame temporaries.
+    """
+    elementwise = True
+    def __init__(self, text:str, name:str=None, **inputs:Operator):
+        self.text = text
+        self.names = list(inputs)
+        self.tree = parse(text, self.names)
+        super().__init__(name=name, **inputs)
+
+    def params(self):
+        return (self.text, tuple(self.names))
+
+    def __call__(self, *values):
+        return compiled(self.text, self.tree, self.names, values)(*values)
@@ -0,0 +1,167 @@
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+from .graph_helpers import CSRGraph
+from .plan import Thunk
+
+
+# rows per block are chosen for blocks of about this many bytes per frame, fitting the L2 cache
+BLOCK_NBYTES = 1 << 18
+
+
+class _Unblockable(Exception):
+    """an input can not be split into the row blocks of the frame"""
+
+
+class _Rows:
+    """
+    Slices the frames seen by a fused kernel to the current row block
+      the frame: the first array of 2 or more dimensions, it sets the height and the rows per block,
+      arrays of its number of dimensions and height are split by rows, the others
+      (scalars, lower dimensional arrays) broadcast as they are
+    """
+    def __init__(self):
+        self.ndim = None
+        self.height = None
+        self.step = None
+        self.rows = None
+
+    def __call__(self, value:Any)->Any:
+        if not isinstance(value, np.ndarray) or value.ndim < 2:
+            return value
+        if self.ndim is None: # the first block
+            self.ndim, self.height = value.ndim, value.shape[0]
+            row_nbytes = max(value.nbytes // max(self.height, 1), 1)
+            self.step = max(1, BLOCK_NBYTES // row_nbytes)
+            self.rows = slice(0, min(self.step, self.height))
+        if value.ndim > self.ndim:
+            raise _Unblockable()
+        if value.ndim == self.ndim and value.shape[0] == self.height:
+            return value[self.rows]
+        return value
+
+
+class FusedKernel:
+    """
+    Consecutive element wise operators evaluated as one, see Operator.elementwise
+      members: the operators in evaluation order, the last one is the result
+      args:    for each member, its arguments: ("input", k) the k-th input of the kernel,
+               ("member", m) the result of the m-th member, ("lazy", k) the k-th lazy input
+      lazy:    the lazy inputs of the members, passed as thunks after the inputs by the plan
+
+    The members are called on row blocks of the frames, the block results are written into
+    a single preallocated output: the intermediates are block sized instead of full frames.
+    Inputs that can not be split by rows are evaluated on the whole frames instead.
+    """
+    def __init__(self, members:List[Any], args:List[List[Tuple[str, int]]], lazy:List[Any]=()):
+        self.members = members
+        self.args = args
+        self.lazy = list(lazy)
+
+    @property
+    def root(self):
+        return self.members[-1]
+
+    def __call__(self, *inputs)->Any:
+        strict = len(inputs) - len(self.lazy)
+        inputs, lazy = inputs[:strict], inputs[strict:]
+        try:
+            return self._blocked(inputs, lazy)
+        except _Unblockable:
+            return self._evaluate(inputs, lazy, lambda value: value) # lazy inputs are evaluated once
+
+    def _evaluate(self, inputs, lazy:Tuple[Thunk, ...], rows)->Any:
+        """the members on the current rows of the inputs"""
+        results = []
+        for N, spec in zip(self.members, self.args):
+            args = []
+            for kind, k in spec:
+                if kind == "input":
+                    args.append(rows(inputs[k]))
+                elif kind == "member":
+                    args.append(results[k])
+                else:
+                    args.append(Thunk(lambda thunk=lazy[k]: rows(thunk())))
+            results.append(N(*args))
+        return results[-1]
+
+    def _blocked(self, inputs, lazy:Tuple[Thunk, ...])->Any:
+        rows = _Rows()
+        first = self._evaluate(inputs, lazy, rows)
+        if rows.ndim is None: # no frame: evaluated whole
+            return first
+        height = rows.height
+        if not isinstance(first, np.ndarray) or first.ndim != rows.ndim or first.shape[0] != rows.rows.stop:
+            raise _Unblockable()
+        out = np.empty((height,) + first.shape[1:], dtype=first.dtype)
+        out[rows.rows] = first
+        for start in range(rows.rows.stop, height, rows.step):
+            rows.rows = slice(start, min(start+rows.step, height))
+            out[rows.rows] = self._evaluate(inputs, lazy, rows)
+        return out
+
+    def __repr__(self):
+        return "Fused({})".format(", ".join(str(N) for N in self.members))
+
+
+def fuse(graph:CSRGraph, outputs:List[int])->Tuple[CSRGraph, Dict[Any, FusedKernel]]:
+    """
+    Group consecutive element wise operators: a node is fused into its consumer when both are
+    element wise, it is the only consumer and the node is not an output.
+    returns the graph without the fused nodes, and the kernel of each group by its last operator
+    """
+    nodes = graph.nodes
+    rows = graph.rows()
+    consumers = graph.transpose().rows()
+    fusable = [N.elementwise and not N.dynamic_dependencies for N in nodes]
+    outputs = set(outputs)
+    into = [ # the consumer a node is fused into
+        consumers[i][0] if fusable[i] and i not in outputs and len(consumers[i]) == 1 and fusable[consumers[i][0]] else None
+        for i in range(len(nodes))
+    ]
+
+    groups: Dict[int, List[int]] = dict()
+    group_of = list(range(len(nodes)))
+    for i in reversed(range(len(nodes))): # consumers first
+        if into[i] is not None:
+            group_of[i] = group_of[into[i]]
+        groups.setdefault(group_of[i], []).append(i)
+
+    kernels: Dict[Any, FusedKernel] = dict()
+    sources: Dict[int, List[int]] = dict() # the inputs of each group
+    for root, group in groups.items():
+        if len(group) < 2:
+            continue
+        group.sort()
+        position = {i: m for m, i in enumerate(group)}
+        inputs: List[int] = []
+        lazy: List[Any] = []
+        args = []
+        for i in group:
+            N = nodes[i]
+            strict = iter(rows[i])
+            spec = []
+            for pos, S in enumerate(N.inputs()):
+                if pos in N.lazy:
+                    spec.append(("lazy", len(lazy)))
+                    lazy.append(S)
+                    continue
+                j = next(strict)
+                if j in position:
+                    spec.append(("member", position[j]))
+                else:
+                    if j not in inputs:
+                        inputs.append(j)
+                    spec.append(("input", inputs.index(j)))
+            args.append(spec)
+        kernels[nodes[root]] = FusedKernel([nodes[i] for i in group], args, lazy)
+        sources[root] = inputs
+
+    if not kernels:
+        return graph, kernels
+    kept = [i for i in range(len(nodes)) if into[i] is None]
+    renumber = {i: k for k, i in enumerate(kept)}
+    return CSRGraph.from_rows(
+        [nodes[i] for i in kept],
+        [[renumber[j] for j in sources.get(i, rows[i])] for i in kept]
+    ), kernels
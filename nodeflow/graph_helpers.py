@@ -1,7 +1,16 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Callable
+from collections import OrderedDict
+import numpy as np
 
 Graph = Dict[Any, List[Any]]
 
+
+class CycleError(ValueError):
+    """raised when the dependencies form a cycle, path is the offending cycle"""
+    def __init__(self, path:List[Any]):
+        self.path = path
+        super().__init__("dependency cycle: {}".format(" -> ".join(repr(n) for n in path)))
+
 def dfs(G:Graph, start):
     """
     Depth First Search
@@ -46,6 +55,140 @@ def topological_sort(G:Graph, root: Any):
     return stack + order[::-1]   # new return value!
 
 
+def dependency_order(root: Any, dependencies:Callable=lambda N: N.dependencies())->Tuple[List[Any], Graph]:
+    """
+    Sort the nodes reachable from root such that every node comes after its dependencies
+    iterative depth first search without networkx, dependencies are queried once per node
+    returns the order (root last) and the dependency graph
+    raises CycleError naming the offending path
+    """
+    G: Graph = OrderedDict()
+    order: List[Any] = []
+
+    G[root] = list(dependencies(root))
+    on_path = {root}
+    stack = [(root, iter(G[root]))]
+    while stack:
+        N, sources = stack[-1]
+        for S in sources:
+            if S in on_path:
+                path = [n for n, _ in stack]
+                raise CycleError(path[path.index(S):] + [S])
+            if S not in G:
+                G[S] = list(dependencies(S))
+                on_path.add(S)
+                stack.append((S, iter(G[S])))
+                break
+        else:
+            stack.pop()
+            on_path.discard(N)
+            order.append(N)
+
+    return order, G
+
+
+class CSRGraph:
+    """
+    Compact graph over integer node ids, in compressed sparse row layout
+      nodes:   the node of each id, ids are in dependency order (sources first)
+      indptr:  the sources of node i are indices[indptr[i]:indptr[i+1]], in argument order
+      indices: source ids
+
+    Passes iterate over ids and index arrays instead of dicts of lists keyed by the nodes.
+    """
+    def __init__(self, nodes:List[Any], indptr:np.ndarray, indices:np.ndarray):
+        self.nodes = nodes
+        self.indptr = indptr
+        self.indices = indices
+        self._transposed = None
+
+    @classmethod
+    def build(cls, root:Any, dependencies:Callable=lambda N: N.dependencies())->"CSRGraph":
+        """
+        the graph of the nodes reachable from root, root last, see dependency_order
+        raises CycleError naming the offending path
+        """
+        order, G = dependency_order(root, dependencies)
+        return cls.from_graph(G, order)
+
+    @classmethod
+    def from_rows(cls, nodes:List[Any], rows:List[List[int]])->"CSRGraph":
+        """nodes in dependency order, and the source ids of each"""
+        indptr = np.zeros(len(rows)+1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        indices = np.fromiter((j for row in rows for j in row), dtype=np.int64, count=int(indptr[-1]))
+        return cls(list(nodes), indptr, indices)
+
+    @classmethod
+    def from_graph(cls, G:Graph, order:List[Any])->"CSRGraph":
+        """a compact copy of a dependency graph, order: a dependency order of its nodes"""
+        ids = {N: i for i, N in enumerate(order)}
+        return cls.from_rows(order, [[ids[S] for S in G[N]] for N in order])
+
+    def to_graph(self)->Graph:
+        """the dependency graph as a dict of lists keyed by the nodes"""
+        nodes = self.nodes
+        return OrderedDict((N, [nodes[j] for j in row]) for N, row in zip(nodes, self.rows()))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def nbytes(self)->int:
+        """size of the index arrays"""
+        return self.indptr.nbytes + self.indices.nbytes
+
+    def sources(self, i:int)->np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i+1]]
+
+    def rows(self)->List[List[int]]:
+        """the source ids of every node as python lists, for per node loops"""
+        indices = self.indices.tolist()
+        bounds = self.indptr.tolist()
+        return [indices[a:b] for a, b in zip(bounds, bounds[1:])]
+
+    def degrees(self)->np.ndarray:
+        return np.diff(self.indptr)
+
+    def transpose(self)->"CSRGraph":
+        """the consumers graph: row i lists the ids of the nodes using node i, once per node"""
+        if self._transposed is None:
+            n = len(self)
+            targets = np.repeat(np.arange(n, dtype=np.int64), self.degrees())
+            # unique edges, sorted by source then consumer
+            edges = np.unique(self.indices * n + targets) if n else self.indices
+            sources, consumers = np.divmod(edges, max(n, 1))
+            indptr = np.zeros(n+1, dtype=np.int64)
+            np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+            self._transposed = CSRGraph(self.nodes, indptr, consumers)
+        return self._transposed
+
+    def downstream(self, seeds)->np.ndarray:
+        """mask of the nodes depending on any of the seed ids (included)"""
+        mask = bytearray(len(self))
+        queue = list(seeds)
+        for i in queue:
+            mask[i] = 1
+        consumers = self.transpose()
+        indptr, indices = consumers.indptr.tolist(), consumers.indices.tolist()
+        while queue:
+            i = queue.pop()
+            for k in indices[indptr[i]:indptr[i+1]]:
+                if not mask[k]:
+                    mask[k] = 1
+                    queue.append(k)
+        return np.frombuffer(mask, dtype=bool)
+
+
+def to_networkx(G:Graph):
+    """export the dependency graph as a networkx DiGraph (edges point to dependencies)"""
+    try:
+        import networkx as nx
+    except ImportError:
+        raise ImportError("networkx is required for exporting graphs: pip install networkx")
+    return nx.DiGraph(G)
+
+
 def display(G:Graph):
     for node, sources in G.items():
         print(node,sources)
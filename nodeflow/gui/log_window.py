@@ -7,9 +7,13 @@ class LogWindow(QPlainTextEdit):
         self.setReadOnly(True)
 
     def write(self, txt):
-        logwindow.moveCursor(QTextCursor.End)
+        self.moveCursor(QTextCursor.End)
         self.insertPlainText(txt)
 
+    def on_event(self, event):
+        """evaluation event listener: events.subscribe(logwindow.on_event)"""
+        self.write(f"{event}\n")
+
     def __enter__(self):
         self._restore_stdout = sys.stdout
         sys.stdout = self
@@ -152,6 +152,12 @@ class SimpleGraph(QGraphicsView):
     def node(self, key):
         return self.nodes[key]
 
+    def colorByVariables(self, tags):
+        """highlight the nodes depending on Variables, tags: see analysis.variable_dependencies"""
+        for n, variables in tags.items():
+            if n in self.nodes:
+                self.nodes[n].setBrush(QColor(200,120,40) if variables else QColor(70,70,70))
+
 
 
 if __name__ == "__main__":
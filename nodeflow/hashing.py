@@ -0,0 +1,143 @@
+from typing import Any, Dict, Tuple
+import hashlib
+import itertools
+import marshal
+import os
+import pickle
+import threading
+import weakref
+
+import numpy as np
+
+
+DIGEST_SIZE = 16
+CHUNK_SIZE = 64 # bytes per sample of sampled_hash
+
+
+# digests of arrays by object: (id, sample) -> (weakref, digest)
+_array_digests: Dict[Tuple[int, int], Tuple[weakref.ref, bytes]] = dict()
+_lock = threading.Lock()
+
+
+def _cached(value:np.ndarray, sample:int, compute)->bytes:
+    key = (id(value), sample)
+    with _lock:
+        entry = _array_digests.get(key)
+    if entry is not None and entry[0]() is value:
+        return entry[1]
+
+    digest = compute(value, sample)
+    forget = lambda ref: _array_digests.pop(key, None)
+    with _lock:
+        _array_digests[key] = (weakref.ref(value, forget), digest)
+    return digest
+
+
+# tokens of unpicklable values by object: id -> (weakref, token), ids are reused after collection
+_identities: Dict[int, Tuple[weakref.ref, bytes]] = dict()
+_counter = itertools.count()
+_salt = os.urandom(8).hex() # tokens of other processes differ
+
+def _identity(value:Any)->bytes:
+    """a token unique to the object, for as long as it is alive"""
+    key = id(value)
+    with _lock:
+        entry = _identities.get(key)
+        if entry is not None and entry[0]() is value:
+            return entry[1]
+        try:
+            ref = weakref.ref(value, lambda ref: _identities.pop(key, None))
+        except TypeError:
+            raise TypeError(f"cannot hash {type(value).__qualname__} values: neither picklable nor weakly referenceable") from None
+        token = f"{type(value).__qualname__}@{_salt}:{next(_counter)}".encode()
+        _identities[key] = (ref, token)
+    return token
+
+
+def _array_hash(value:np.ndarray, sample:int=None)->bytes:
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    h.update(str(value.dtype).encode())
+    h.update(repr(value.shape).encode())
+    data = np.ascontiguousarray(value).reshape(-1).view(np.uint8)
+    if sample is None or data.nbytes <= sample:
+        h.update(data.data)
+    else:
+        # evenly spaced chunks, always including the first and last bytes
+        count = max(sample // CHUNK_SIZE, 2)
+        starts = np.linspace(0, data.nbytes - CHUNK_SIZE, count).astype(np.int64)
+        h.update(b"sampled")
+        h.update(data[starts[:, None] + np.arange(CHUNK_SIZE)].data)
+    return h.digest()
+
+
+def content_hash(value:Any, sample:int=None, cache:bool=True)->bytes:
+    """
+    Digest of a value by content
+      numpy arrays are hashed over their buffer, with dtype and shape mixed in
+      other values are hashed by their pickled representation,
+      values that cannot be pickled by a token unique to the object while it is alive
+
+      sample: hash at most this many bytes of large arrays, see sampled_hash
+      cache:  remember the digest of an array per object,
+              arrays are then assumed not to be modified in place
+    """
+    if isinstance(value, np.ndarray):
+        if cache:
+            return _cached(value, sample, _array_hash)
+        return _array_hash(value, sample)
+
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    try:
+        h.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        h.update(_identity(value))
+    return h.digest()
+
+
+def sampled_hash(value:Any, sample:int=1<<20, cache:bool=True)->bytes:
+    """
+    Content hash of large arrays over evenly spaced samples of their buffer (1MB by default)
+    much cheaper than a full hash, but arrays differing in unsampled bytes only collide
+    """
+    return content_hash(value, sample=sample, cache=cache)
+
+
+def function_hash(f:Any)->bytes:
+    """
+    Digest of a function by its code, defaults and the values of its closure cells at the time of the call:
+    closures of one factory with different captured values differ, callables without code hash by content_hash
+    """
+    code = getattr(f, "__code__", None)
+    if code is None:
+        return content_hash(f)
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    h.update(marshal.dumps(code))
+    for value in (f.__defaults__, f.__kwdefaults__):
+        h.update(content_hash(value))
+    for cell in f.__closure__ or ():
+        try:
+            value = cell.cell_contents
+        except ValueError: # not assigned yet
+            h.update(b"empty")
+            continue
+        h.update(content_hash(value))
+    return h.digest()
+
+
+def _feed(h, part:Any):
+    if isinstance(part, bytes):
+        h.update(part)
+    else:
+        try:
+            h.update(pickle.dumps(part, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            h.update(repr(part).encode())
+
+
+def digest(*parts:Any)->bytes:
+    """fixed size digest of the parts, bytes are fed as is"""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for part in parts:
+        _feed(h, part)
+        h.update(b"|")
+    return h.digest()
@@ -20,9 +20,6 @@ class Read(Operator):
             raise FileNotFoundError(filename)
         return cv2.imread(filename).astype(np.float32)/255.0
 
-    def key(self):
-        return ("Read", self.args[0].key())
-
 
 class Ramp(Operator):
     def __init__(self, size: Tuple[int, int], name:str=None):
@@ -35,8 +32,11 @@ class Ramp(Operator):
         rgb = np.dstack([R, G, B])
         return rgb
 
-    def key(self):
-        return ("Ramp", self.width, self.height)
+    def params(self):
+        return (self.width, self.height)
+
+    def estimate_nbytes(self, input_nbytes):
+        return 720*1280*3*np.dtype(np.float32).itemsize # the ramp is 1280x720 regardless of size
 
 
 # class ClipCache:
@@ -62,6 +62,9 @@ class GaussianBlur(Operator):
     def __call__(self, img:np.ndarray):
         return cv2.GaussianBlur(img,(75,75),0)
 
+    def estimate_nbytes(self, input_nbytes):
+        return input_nbytes[0]
+
 
 class BilateralFilter(Operator):
     def __init__(self, img:Operator, name=None):
@@ -70,6 +73,9 @@ class BilateralFilter(Operator):
     def __call__(self, img:np.ndarray):
         return cv2.bilateralFilter(img,90,75,75)
 
+    def estimate_nbytes(self, input_nbytes):
+        return input_nbytes[0]
+
 
 """
 Transform
@@ -86,13 +92,26 @@ class Resize(Operator):
 Merges
 """
 class Blend(Operator):
+    lazy = (0, 1) # at mix 0 or 1 the other image is not evaluated
+    elementwise = True
     def __init__(self, A:Operator, B:Operator, mix:Operator):
         super().__init__(A, B, mix)
 
-    def __call__(self, A:np.ndarray, B:np.ndarray, mix:float):
+    def needed(self, mix:float):
+        return (0,) if mix == 0 else (1,) if mix == 1 else (0, 1)
+
+    def __call__(self, A, B, mix:float):
+        if mix == 0:
+            return A()
+        if mix == 1:
+            return B()
+        A, B = A(), B()
         assert(A.shape == B.shape)
         return A*(1-mix) + B*mix
 
+    def estimate_nbytes(self, input_nbytes):
+        return max(input_nbytes[0], input_nbytes[1])
+
 
 if __name__ == "__main__":
 
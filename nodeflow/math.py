@@ -3,6 +3,9 @@ from nodeflow.core import Operator, Constant, operator
 
 
 class Plus(Operator):
+    __slots__ = ()
+    broadcast_safe = True
+    elementwise = True
     def __init__(self, A:Operator, B:Operator):
         super().__init__(A, B)
 
@@ -11,6 +14,9 @@ class Plus(Operator):
 
 
 class Minus(Operator):
+    __slots__ = ()
+    broadcast_safe = True
+    elementwise = True
     def __init__(self, A:Operator, B:Operator):
         super().__init__(A, B)
 
@@ -19,6 +25,9 @@ class Minus(Operator):
 
 
 class Multiply(Operator):
+    __slots__ = ()
+    broadcast_safe = True
+    elementwise = True
     def __init__(self, A:Operator, B:Operator):
         super().__init__(A, B)
 
@@ -27,6 +36,9 @@ class Multiply(Operator):
 
 
 class Divide(Operator):
+    __slots__ = ()
+    broadcast_safe = True
+    elementwise = True
     def __init__(self, A:Operator, B:Operator):
         super().__init__(A, B)
 
@@ -0,0 +1,833 @@
+from typing import List, Dict, Any, Tuple, Callable, Iterable
+from concurrent.futures import Executor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import asyncio
+import inspect
+import threading
+import weakref
+import numpy as np
+from .graph_helpers import CSRGraph, display
+from .hashing import content_hash
+from .storage import sizeof
+from . import events
+
+
+# bumped whenever the structure of any graph changes (see Operator.set_inputs)
+_structure_version = 0
+
+def structure_changed():
+    global _structure_version
+    _structure_version += 1
+
+# bumped whenever any operator is invalidated, results computed before are out of date
+generation = 0
+
+def graph_changed():
+    global generation
+    generation += 1
+
+# operators whose output may be out of date (see Operator.invalidate)
+dirty_operators = weakref.WeakSet()
+
+def collect_dirty(index:Dict[Any, int])->List[int]:
+    """
+    the indices of the dirty operators of a plan, from the registry or from the plan,
+    whichever is smaller: the cost does not grow with the dirty operators of other graphs
+    """
+    if len(dirty_operators) > len(index):
+        dirty = (i for N, i in index.items() if N._dirty)
+    else:
+        dirty = (index[N] for N in list(dirty_operators) if N._dirty and N in index)
+    return sorted(set(dirty))
+
+def release_clean(operators:Iterable[Any]):
+    """drop the operators cleaned by an evaluation from the registry, the dirty ones stay"""
+    for N in operators:
+        if not N._dirty:
+            dirty_operators.discard(N)
+
+
+def unchanged(N, value)->bool:
+    """early cutoff: compare a recomputed output to the previous one"""
+    mode = N.early_cutoff
+    old = N._output
+    if mode == "identity":
+        return value is old
+    if mode == "equal":
+        if type(value) is not type(old): # 1 and 1.0 compare equal
+            return False
+        if isinstance(value, (np.ndarray, np.generic)):
+            return value.dtype == old.dtype and value.shape == old.shape and np.array_equal(value, old)
+        try:
+            return bool(value == old)
+        except Exception:
+            return False
+    if mode == "hash":
+        digest = content_hash(value, cache=False) # outputs may be modified in place
+        changed = digest != N._output_hash
+        N._output_hash = digest
+        return not changed
+    raise ValueError(f"unknown early cutoff mode: {mode}")
+
+
+def store(N, value, input_versions):
+    """keep a recomputed output, bumping the version unless it is unchanged"""
+    N._input_versions = input_versions
+    N._modified = False
+    if N.early_cutoff and unchanged(N, value) and N._version:
+        return
+    N._output = value
+    N._version += 1
+
+
+class _Batch:
+    """the virtual root of a batch, depending on the requested roots"""
+    def __init__(self, roots:List[Any]):
+        self.roots = roots
+
+    def dependencies(self):
+        return self.roots
+
+    def inputs(self):
+        return self.roots
+
+
+_pending = object()
+
+class Thunk:
+    """a lazy input: evaluated on the first call, see Operator.lazy"""
+    def __init__(self, evaluate:Callable[[], Any]):
+        self._evaluate = evaluate
+        self._value = _pending
+
+    def __call__(self)->Any:
+        if self._value is _pending:
+            self._value = self._evaluate()
+            self._evaluate = None
+        return self._value
+
+
+def check_sync(N):
+    if inspect.iscoroutinefunction(N.__call__):
+        raise TypeError(f"{N} is async and cannot be evaluated synchronously, use evaluate_async")
+
+
+class _LazyInputs:
+    """
+    The lazy inputs of one run of a plan, each evaluated once, one at a time (the thunks may be
+    called from the threads of an executor)
+      resolve: the value of the i-th node of the running plan, for runs of all nodes: the lazy
+               inputs are then evaluated node by node reusing the values of the run,
+               otherwise by their own incremental plans, after the nodes of the run they depend on
+      loop:    the event loop of an asynchronous run: the lazy inputs are evaluated with evaluate_async,
+               async operators get awaitables from their thunks
+    The inputs a consumer declares it needs (see Operator.needed) are evaluated ahead by prefetch,
+    together: concurrently with an executor or on the event loop
+    """
+    def __init__(self, plan:"EvaluationPlan", resolve:Callable[[int], Any]=None, loop:asyncio.AbstractEventLoop=None):
+        self.plan = plan
+        self.resolve = resolve
+        self.loop = loop
+        self.memo: Dict[Any, Any] = dict()
+        self._lock = threading.RLock() # nested lazy inputs are evaluated on the same thread
+        self._tasks: Dict[Any, asyncio.Future] = dict()
+        self._async_lock: asyncio.Lock = None
+
+    def thunk(self, S)->Thunk:
+        if self.loop is not None:
+            return Thunk(lambda: self.value_threadsafe(S))
+        return Thunk(lambda: self.value(S))
+
+    def value_threadsafe(self, S)->Any:
+        """the value from a thread of the asynchronous run, an awaitable on the event loop"""
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            return asyncio.ensure_future(self.value_async(S))
+        return asyncio.run_coroutine_threadsafe(self.value_async(S), self.loop).result()
+
+    def needed(self, N, args:List[Any])->List[Any]:
+        """the lazy inputs of the node a call with the other arguments will use, None when unknown"""
+        positions = N.needed(*args)
+        if positions is None:
+            return None
+        return [S for pos, S in self.plan.lazy[N] if pos in positions]
+
+    def prefetch(self, inputs:List[Any], executor:Executor=None):
+        """evaluate the inputs by one plan, the thunks of the consumer then find them in the memo"""
+        inputs = [S for S in inputs if S not in self.memo]
+        if inputs:
+            values = self.plan.lazy_plan(inputs).run(executor=executor)
+            with self._lock:
+                self.memo.update(zip(inputs, values))
+
+    async def prefetch_async(self, inputs:List[Any]):
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            inputs = [S for S in inputs if S not in self.memo]
+            if inputs:
+                values = await self.plan.lazy_plan(inputs).run_async()
+                self.memo.update(zip(inputs, values))
+
+    async def value_async(self, S)->Any:
+        if S in self.memo:
+            return self.memo[S]
+        task = self._tasks.get(S)
+        if task is None:
+            task = self._tasks[S] = asyncio.ensure_future(self._evaluate_async(S))
+        return await task
+
+    async def _evaluate_async(self, S)->Any:
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            if S not in self.memo:
+                self.memo[S] = await S.evaluate_async()
+            return self.memo[S]
+
+    def value(self, S)->Any:
+        with self._lock:
+            if S not in self.memo:
+                self.memo[S] = S.evaluate() if self.resolve is None else self._evaluate(S)
+            return self.memo[S]
+
+    def _evaluate(self, S)->Any:
+        """the nodes of the plan of S not known to the run, in order"""
+        index, memo = self.plan.index, self.memo
+        plan = S.plan()
+        order = plan.order
+        needed = set(plan.outputs)
+        schedule: List[int] = []
+        for j in reversed(range(len(order))):
+            X = order[j]
+            if j not in needed or X in index or X in memo:
+                continue
+            needed.update(plan.slots[j])
+            schedule.append(j)
+
+        get = lambda X: self.resolve(index[X]) if X in index else memo[X]
+        for j in reversed(schedule):
+            X = order[j]
+            args = [get(order[k]) for k in plan.slots[j]]
+            if X in plan.lazy:
+                for pos, T in plan.lazy[X]:
+                    args.insert(pos, self.thunk(T))
+            check_sync(X)
+            memo[X] = events.call(X, args) if events.listening else X(*args)
+        return get(S)
+
+
+def merge_keys(nodes:List[Any])->Dict[Any, bytes]:
+    """the keys to merge the nodes and their upstream by, see Operator.merge_key"""
+    keys: Dict[Any, bytes] = dict()
+    missing = lambda N: [S for S in N.inputs() if S not in keys]
+    for start in nodes:
+        if start in keys:
+            continue
+        for N in CSRGraph.build(start, dependencies=missing).nodes:
+            keys[N] = N.merge_key([keys[S] for S in N.inputs()])
+    return keys
+
+
+def memory_order(sources:List[List[int]], nbytes:List[int], outputs:List[int])->List[int]:
+    """
+    A topological order of the nodes keeping the peak size of live results low
+      every node evaluates the input that needs the most memory beyond its own result first
+      (Sethi-Ullman numbering, optimal for trees, shared inputs are counted per consumer)
+      sources: input indices of each node, in a topological order
+    """
+    need = [0] * len(sources) # peak while evaluating the node and its inputs
+    ranked = []
+    for i, s in enumerate(sources):
+        s = sorted(s, key=lambda j: need[j] - nbytes[j], reverse=True)
+        held = peak = 0
+        for j in s:
+            peak = max(peak, held + need[j])
+            held += nbytes[j]
+        need[i] = max(peak, held + nbytes[i])
+        ranked.append(s)
+
+    # depth first, inputs in ranked order
+    order = []
+    seen = [False] * len(sources)
+    for root in outputs:
+        if seen[root]:
+            continue
+        seen[root] = True
+        stack = [(root, iter(ranked[root]))]
+        while stack:
+            i, inputs = stack[-1]
+            for j in inputs:
+                if not seen[j]:
+                    seen[j] = True
+                    stack.append((j, iter(ranked[j])))
+                    break
+            else:
+                order.append(i)
+                stack.pop()
+    return order
+
+
+def peak_nbytes(sources:List[List[int]], consumers:List[List[int]], nbytes:List[int], outputs:List[int])->int:
+    """the peak size of live results evaluating the nodes in index order, releasing them after their last use"""
+    remaining = [len(c) for c in consumers]
+    for i in outputs:
+        remaining[i] += 1
+    live = peak = 0
+    for i, s in enumerate(sources):
+        live += nbytes[i] # the inputs are alive while computing
+        peak = max(peak, live)
+        for j in s:
+            remaining[j] -= 1
+            if remaining[j] == 0:
+                live -= nbytes[j]
+    return peak
+
+
+class EvaluationPlan:
+    """
+    Compiled evaluation schedule for a root operator, or a batch of roots
+      graph:     the compact graph (CSRGraph) over integer ids, the positions in order
+      order:     operators in evaluation order (dependencies first)
+      slots:     for each node, the indices (into order) of its arguments
+      consumers: for each node, the indices of the nodes using its result
+      outputs:   the indices of the roots
+      merged:    {duplicate: representative}, operators merged by structural key (merge=True)
+      fused:     {operator: FusedKernel}, the element wise operators fused into the kernel of the last one
+                 (fuse=True, see fusion.fuse)
+      predicted_peak, peak: the expected and the last measured peak size of live results
+                 of non incremental evaluations in bytes (low_memory=True)
+
+    The plan is built once and reused until the graph structure changes.
+    """
+    def __init__(self, root, verbose=False, static=False, merge=False, low_memory=False, fuse=False):
+        self.static = static
+        self.merge = merge
+        self.low_memory = low_memory
+        self.fuse = fuse
+        self.batch = isinstance(root, (list, tuple))
+        self.roots: List[Any] = list(root) if self.batch else [root]
+        self.root = self.roots[-1]
+        self.version = _structure_version
+
+        dependencies = (lambda N: N.inputs()) if static else (lambda N: N.dependencies())
+        if self.batch:
+            graph = CSRGraph.build(_Batch(self.roots), dependencies=dependencies)
+            graph = CSRGraph(graph.nodes[:-1], graph.indptr[:-1], graph.indices[:graph.indptr[-2]])
+        else:
+            graph = CSRGraph.build(root, dependencies=dependencies)
+        if verbose:
+            print("\nGraph:")
+            display(graph.to_graph())
+
+        # common subexpressions: evaluate the first of the operators with equal keys only
+        self.merged: Dict[Any, Any] = dict()
+        if merge:
+            keys = merge_keys(graph.nodes)
+            first = dict()
+            representative = [] # id of the representative of each node
+            for i, N in enumerate(graph.nodes):
+                representative.append(first.setdefault(keys[N], i))
+                if representative[i] != i:
+                    self.merged[N] = graph.nodes[representative[i]]
+            if self.merged:
+                kept = [i for i, r in enumerate(representative) if r == i]
+                renumber = {i: k for k, i in enumerate(kept)}
+                rows = graph.rows()
+                graph = CSRGraph.from_rows(
+                    [graph.nodes[i] for i in kept],
+                    [[renumber[representative[j]] for j in rows[i]] for i in kept]
+                )
+            if verbose: print(f"\nMerged {len(self.merged)} duplicate operators")
+        self._merge_generation = generation
+
+        # element wise chains: evaluate each as one kernel over row blocks
+        self.fused: Dict[Any, Any] = dict()
+        if fuse:
+            from .fusion import fuse as fuse_elementwise
+            ids = {N: i for i, N in enumerate(graph.nodes)}
+            graph, self.fused = fuse_elementwise(graph, [ids[self.merged.get(N, N)] for N in self.roots])
+            if verbose: print(f"\nFused {sum(len(kernel.members) for kernel in self.fused.values())} operators into {len(self.fused)} kernels")
+        self._index(graph)
+
+        # operators whose dependencies change without set_inputs (eg.: Cache)
+        order = self.order
+        self.dynamic: List[Tuple[Any, Tuple]] = [] if static else [
+            (N, tuple(order[j] for j in self.slots[i])) for i, N in enumerate(order) if N.dynamic_dependencies
+        ]
+
+        # operators with lazy inputs: {operator: [(argument position, lazy input)]}
+        # the lazy inputs are not part of dynamic plans, their consumers get thunks instead
+        self.lazy: Dict[Any, List[Tuple[int, Any]]] = {
+            N: [(pos, S) for pos, S in enumerate(N.inputs()) if pos in N.lazy] for N in self.order if N.lazy and N not in self.fused
+        }
+        for N, kernel in self.fused.items(): # passed after the inputs of the kernel
+            if kernel.lazy:
+                self.lazy[N] = [(len(self.slots[self.index[N]]) + k, S) for k, S in enumerate(kernel.lazy)]
+        # the operators of the plan the lazy inputs depend on: evaluated before their consumers
+        # in parallel, and held by runs of all nodes
+        self.lazy_sources: Dict[Any, List[Any]] = {N: self._lazy_sources(N) for N in self.lazy}
+        self._lazy_plans: Dict[Tuple, EvaluationPlan] = dict() # see lazy_plan
+
+        self.nbytes: List[int] = None # output sizes the order was chosen for
+        self.predicted_peak: int = None
+        self.peak: int = None
+        if low_memory:
+            self.schedule_memory()
+            if verbose: print(f"\nPredicted peak: {self.predicted_peak} bytes")
+        if events.listening: events.emit(events.PlanBuilt(self))
+
+    def _index(self, graph:CSRGraph):
+        """adopt the compact graph, and derive the per node lists of the evaluation loops"""
+        self.graph = graph
+        self.order: List[Any] = graph.nodes
+        self.index: Dict[Any, int] = {N: i for i, N in enumerate(self.order)}
+        for N, representative in self.merged.items():
+            self.index[N] = self.index[representative]
+        self.slots: List[List[int]] = graph.rows()
+        self.coroutines: List[int] = [i for i, N in enumerate(self.order) if inspect.iscoroutinefunction(N.__call__)]
+
+        # unique argument indices, and the reverse: consumers
+        self.sources: List[List[int]] = [
+            slots if len(slots) < 2 or len(set(slots)) == len(slots) else list(dict.fromkeys(slots))
+            for slots in self.slots
+        ]
+        self.consumers: List[List[int]] = graph.transpose().rows()
+        self.outputs: List[int] = [self.index[root] for root in self.roots]
+
+        self._variables = None
+        self._masks = None
+        self._affected: Dict[frozenset, frozenset] = dict()
+        self._shared: Tuple[int, Dict[int, Any]] = (None, dict())
+
+    def __len__(self):
+        return len(self.order)
+
+    def estimate_nbytes(self)->List[int]:
+        """output sizes: measured in the last low memory evaluation, or estimated by the operators, otherwise 0"""
+        nbytes = []
+        for N, sources in zip(self.order, self.slots):
+            size = N._nbytes
+            if size is None:
+                size = N.estimate_nbytes([nbytes[j] for j in sources])
+            nbytes.append(size or 0)
+        return nbytes
+
+    def schedule_memory(self):
+        """reorder the plan to reduce the peak size of live results, see memory_order"""
+        nbytes = self.estimate_nbytes()
+        permutation = memory_order(self.sources, nbytes, self.outputs)
+        position = [0] * len(permutation)
+        for p, i in enumerate(permutation):
+            position[i] = p
+        self._index(CSRGraph.from_rows(
+            [self.order[i] for i in permutation],
+            [[position[j] for j in self.slots[i]] for i in permutation]
+        ))
+
+        self.nbytes = [nbytes[i] for i in permutation]
+        self.predicted_peak = peak_nbytes(self.sources, self.consumers, self.nbytes, self.outputs)
+
+    def results(self, values:List[Any]=None):
+        """the root value, or the list of root values of a batch"""
+        if values is None: # the outputs kept by the operators
+            outputs = [self.order[i]._output for i in self.outputs]
+        else:
+            outputs = [values[i] for i in self.outputs]
+        return outputs if self.batch else outputs[0]
+
+    def variable_masks(self)->Tuple[List[Any], List[int]]:
+        """the Variables of the plan, and for each node a bit mask of the ones it depends on"""
+        if self._masks is None:
+            from .analysis import variable_masks
+            self._masks = variable_masks(self.graph)
+        return self._masks
+
+    def variables(self)->List[frozenset]:
+        """for each node, the Variables it depends on (see analysis.variable_dependencies)"""
+        if self._variables is None:
+            from .analysis import from_mask
+            variables, masks = self.variable_masks()
+            self._variables = [from_mask(variables, mask) for mask in masks]
+        return self._variables
+
+    def affected(self, operators)->frozenset:
+        """indices of the nodes depending on any of the variables (included)"""
+        operators = frozenset(operators)
+        affected = self._affected.get(operators)
+        if affected is None:
+            variables, masks = self.variable_masks()
+            selected = sum(1 << bit for bit, var in enumerate(variables) if var in operators)
+            affected = frozenset(i for i, mask in enumerate(masks) if mask & selected)
+            self._affected[operators] = affected
+        return affected
+
+    def last_change(self)->int:
+        """the generation of the last invalidation of an operator of the plan"""
+        return max(N._invalidated for N in self.index)
+
+    def shared(self)->Dict[int, Any]:
+        """
+        results of dirty nodes computed during context evaluations, shared by the contexts
+        they hold until an operator of the plan is invalidated
+        """
+        shared = self._shared
+        change = self.last_change()
+        if shared[0] != change:
+            shared = self._shared = (change, dict())
+        return shared[1]
+
+    def is_valid(self)->bool:
+        if self.version != _structure_version:
+            return False
+        for N, deps in self.dynamic: # the clean ones are not evaluated
+            if N._dirty and tuple(N.dependencies()) != deps:
+                return False
+        if self.merged and self._merge_generation != generation:
+            # a parameter changed, the merged operators may differ now
+            keys = merge_keys([*self.merged.keys(), *self.merged.values()])
+            if any(keys[N] != keys[representative] for N, representative in self.merged.items()):
+                return False
+            self._merge_generation = generation
+        return True
+
+    def check_sync(self, indices:Iterable[int]):
+        """raise before evaluating any of the nodes if one of them is async"""
+        indices = set(indices)
+        for i in self.coroutines:
+            if i in indices:
+                check_sync(self.order[i])
+
+    def dirty(self)->List[int]:
+        """indices of the dirty nodes, in evaluation order"""
+        return collect_dirty(self.index)
+
+    def release(self, dirty:List[int]):
+        """drop the nodes cleaned by the run from the registry of dirty operators"""
+        if dirty:
+            release_clean([self.order[i] for i in dirty])
+            release_clean(self.merged)
+
+    def update_merged(self):
+        """duplicates take over the state of their representative, as if evaluated themselves"""
+        for N, representative in self.merged.items():
+            if N._dirty and not representative._dirty:
+                N._output = representative._output
+                N._output_hash = representative._output_hash
+                N._version = representative._version
+                N._input_versions = representative._input_versions
+                N._modified = False
+                N._dirty = False
+
+    def input_versions(self, i:int)->Tuple[int, ...]:
+        order = self.order
+        return tuple(order[j]._version for j in self.slots[i])
+
+    def must_recompute(self, i:int, input_versions:Tuple[int, ...])->bool:
+        """a dirty node is recomputed unless its inputs turned out unchanged (early cutoff)"""
+        N = self.order[i]
+        return N._modified or N.dynamic_dependencies or N in self.lazy or N._input_versions != input_versions
+
+    def _lazy_sources(self, N)->List[Any]:
+        index = self.index
+        found, seen = [], set()
+        stack = [S for pos, S in self.lazy[N]]
+        while stack:
+            X = stack.pop()
+            if X in seen:
+                continue
+            seen.add(X)
+            if X in index:
+                found.append(X)
+            else:
+                stack.extend(X.inputs())
+        return found
+
+    def lazy_plan(self, inputs:List[Any])->"EvaluationPlan":
+        """the plan evaluating lazy inputs together, reused while valid"""
+        key = tuple(inputs)
+        plan = self._lazy_plans.get(key)
+        if plan is None or not plan.is_valid():
+            plan = self._lazy_plans[key] = EvaluationPlan(list(inputs))
+        return plan
+
+    def arguments(self, N, args:List[Any], lazy:_LazyInputs)->List[Any]:
+        """insert the thunks of the lazy inputs of the node into its arguments"""
+        for pos, S in self.lazy[N]:
+            args.insert(pos, lazy.thunk(S))
+        return args
+
+    def run(self, verbose=False, executor:Executor=None):
+        """
+        recompute the dirty nodes only, every node keeps its last output
+          executor: dispatch nodes to the executor as soon as their inputs are complete
+        """
+        dirty = self.dirty()
+        if self.coroutines:
+            self.check_sync(dirty)
+        if verbose: print("\nEvaluate dirty nodes (in order:", [self.order[i] for i in dirty], ")")
+        if executor is None:
+            self._run_sequential(dirty, verbose)
+        else:
+            self._run_parallel(dirty, executor, verbose)
+        if verbose: print()
+
+        self.update_merged()
+        self.release(dirty)
+        return self.results()
+
+    def prerequisites(self, i:int)->List[int]:
+        """the nodes completed before the node runs: its inputs, and the nodes its lazy inputs depend on"""
+        N = self.order[i]
+        if N not in self.lazy:
+            return self.sources[i]
+        index = self.index
+        return list(dict.fromkeys(self.sources[i] + [index[X] for X in self.lazy_sources[N]]))
+
+    def _run_sequential(self, dirty:List[int], verbose=False):
+        order = self.order
+        lazy = _LazyInputs(self)
+        for i in dirty:
+            N = order[i]
+            input_versions = self.input_versions(i)
+            if not self.must_recompute(i, input_versions):
+                if verbose: print(f"  skip: {N}, inputs are unchanged")
+                N._dirty = False
+                continue
+            args = [order[j]._output for j in self.slots[i]]
+            if N in self.lazy: args = self.arguments(N, args, lazy)
+            if verbose: print(f"  evaluate: {N} with arguments: {args}")
+            value = events.call(N, args) if events.listening else N(*args) # evaluate node with arguments
+            if verbose:
+                print(f"    {N}({', '.join(repr(arg)[:10] for arg in args)}) => {repr(value)[:10]}")
+            store(N, value, input_versions)
+            N._dirty = False
+
+    def _run_parallel(self, dirty:List[int], executor:Executor, verbose=False):
+        """
+        submit the dirty nodes whose dirty inputs are complete, results are stored on this thread
+        the lazy inputs run on a helper thread, one consumer at a time: the inputs a consumer needs
+        are evaluated ahead by one plan on the executor, then the consumer is submitted.
+        Consumers that do not tell are called on the helper, their thunks never block the workers
+        """
+        order = self.order
+        waiting = {i: 0 for i in dirty} # number of incomplete dirty inputs
+        after: Dict[int, List[int]] = dict() # the consumers of lazy inputs waiting on the node
+        for i in dirty:
+            waiting[i] = sum(1 for j in self.sources[i] if j in waiting)
+            if order[i] in self.lazy:
+                for j in self.prerequisites(i)[len(self.sources[i]):]:
+                    if j in waiting:
+                        waiting[i] += 1
+                        after.setdefault(j, []).append(i)
+        ready = [i for i in reversed(dirty) if waiting[i] == 0]
+        running = dict() # future: (index, input versions, timed in a worker), without versions for prefetches
+        error = None
+
+        lazy = _LazyInputs(self)
+        helper: Executor = None
+        prefetched = set()
+
+        def complete(i):
+            order[i]._dirty = False
+            for k in self.consumers[i] + after.get(i, []):
+                if k in waiting:
+                    waiting[k] -= 1
+                    if waiting[k] == 0:
+                        ready.append(k)
+
+        while ready or running:
+            while ready and error is None:
+                i = ready.pop()
+                N = order[i]
+                input_versions = self.input_versions(i)
+                if not self.must_recompute(i, input_versions):
+                    if verbose: print(f"  skip: {N}, inputs are unchanged")
+                    complete(i)
+                    continue
+                args = [order[j]._output for j in self.slots[i]]
+                target = executor
+                if N in self.lazy:
+                    inputs = lazy.needed(N, args) if i not in prefetched else []
+                    if helper is None and inputs != []:
+                        helper = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lazy")
+                    if inputs:
+                        if verbose: print(f"  prefetch: {inputs} for {N}")
+                        prefetched.add(i)
+                        running[helper.submit(lazy.prefetch, inputs, executor)] = (i, None, None)
+                        continue
+                    if inputs is None:
+                        target = helper
+                    args = self.arguments(N, args, lazy)
+                if verbose: print(f"  submit: {N}")
+                if not events.listening:
+                    running[target.submit(N, *args)] = (i, input_versions, False)
+                elif getattr(executor, "ships", None) and executor.ships(N):
+                    # started on submission, the worker reports its own times
+                    events.emit(events.NodeStarted(N, type(executor).__name__))
+                    running[executor.submit_timed(N, *args)] = (i, input_versions, True)
+                else:
+                    running[target.submit(events.call, N, args)] = (i, input_versions, False)
+
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, input_versions, timed = running.pop(future)
+                try:
+                    value = future.result()
+                except BaseException as err:
+                    if timed:
+                        events.emit(events.NodeError(order[i], err))
+                    error = error or err # wait for the running nodes, then raise
+                    continue
+                if input_versions is None: # the lazy inputs are ready
+                    ready.append(i)
+                    continue
+                if timed:
+                    value, t = value
+                    events.emit(events.NodeFinished(order[i], value, t.start, t.wall, t.cpu, t.thread, t.pid))
+                if verbose: print(f"  done: {order[i]} => {repr(value)[:10]}")
+                store(order[i], value, input_versions)
+                complete(i)
+
+        if helper is not None:
+            helper.shutdown()
+        if error is not None:
+            raise error
+
+    async def run_async(self, verbose=False):
+        """
+        recompute the dirty nodes on the running event loop
+          async operators are awaited, sync operators run in a thread,
+          a node starts as soon as its dirty inputs are complete, and the lazy inputs it needs
+        """
+        dirty = self.dirty()
+        if verbose: print("\nEvaluate dirty nodes asynchronously (in order:", [self.order[i] for i in dirty], ")")
+        order = self.order
+        limits = dict() # operator class: semaphore
+        lazy = _LazyInputs(self, loop=asyncio.get_running_loop())
+
+        def limit(N):
+            cls = N.__class__
+            if cls not in limits:
+                limits[cls] = asyncio.Semaphore(cls.concurrency) if cls.concurrency else None
+            return limits[cls]
+
+        async def evaluate(i):
+            await asyncio.gather(*(tasks[j] for j in self.prerequisites(i) if j in tasks))
+            N = order[i]
+            input_versions = self.input_versions(i)
+            if not self.must_recompute(i, input_versions):
+                if verbose: print(f"  skip: {N}, inputs are unchanged")
+                N._dirty = False
+                return
+            args = [order[j]._output for j in self.slots[i]]
+            if N in self.lazy:
+                inputs = lazy.needed(N, args)
+                if inputs:
+                    await lazy.prefetch_async(inputs)
+                args = self.arguments(N, args, lazy)
+            semaphore = limit(N)
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                if verbose: print(f"  evaluate: {N}")
+                if inspect.iscoroutinefunction(N.__call__):
+                    value = await (events.call_async(N, args) if events.listening else N(*args))
+                elif events.listening:
+                    value = await asyncio.to_thread(events.call, N, args)
+                else:
+                    value = await asyncio.to_thread(N, *args)
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+            if verbose: print(f"  done: {N} => {repr(value)[:10]}")
+            store(N, value, input_versions)
+            N._dirty = False
+
+        tasks = dict() # inputs come first in the dirty order
+        for i in dirty:
+            tasks[i] = asyncio.ensure_future(evaluate(i))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        if verbose: print()
+
+        self.update_merged()
+        self.release(dirty)
+        return self.results()
+
+    def run_all(self, verbose=False):
+        """
+        evaluate all nodes in order, releasing results once all consumers are done
+          low memory plans measure the output sizes, and the peak size of live results
+        """
+        if self.coroutines:
+            self.check_sync(range(len(self.order)))
+        if verbose: print("\nEvaluate graph (in order:", self.order, ")")
+        order = self.order
+        measure = self.low_memory
+        values: List[Any] = [_pending] * len(order)
+        remaining = [len(consumers) for consumers in self.consumers]
+        for i in self.outputs: # results are held until returned
+            remaining[i] += 1
+        for i in set(self.index[X] for sources in self.lazy_sources.values() for X in sources):
+            remaining[i] += 1 # and the results lazy inputs depend on, until the end of the run
+        live = peak = 0
+
+        def evaluate(i):
+            nonlocal live, peak
+            N = order[i]
+            args = [values[j] for j in self.slots[i]]
+            if N in self.lazy: args = self.arguments(N, args, lazy)
+            f = self.fused.get(N, N) # the kernel of a fused chain
+            if verbose: print(f"  evaluate: {f} with arguments: {args}")
+            value = events.call(f, args) if events.listening else f(*args) # evaluate node with arguments
+            if verbose:
+                print(f"    {f}({', '.join(repr(arg)[:10] for arg in args)}) => {repr(value)[:10]}")
+            values[i] = value
+            if measure:
+                N._nbytes = sizeof(value)
+                live += N._nbytes
+                peak = max(peak, live)
+
+        def resolve(i):
+            """the result of a node for a lazy input, evaluated ahead of the order with its inputs if needed"""
+            if values[i] is _pending:
+                ahead, stack = {i}, [i]
+                while stack:
+                    for j in self.sources[stack.pop()]:
+                        if values[j] is _pending and j not in ahead:
+                            ahead.add(j)
+                            stack.append(j)
+                for j in sorted(ahead):
+                    if values[j] is _pending:
+                        evaluate(j)
+            return values[i]
+        lazy = _LazyInputs(self, resolve)
+
+        for i in range(len(order)):
+            if values[i] is _pending: # unless evaluated ahead
+                evaluate(i)
+
+            # release results used for evaluation
+            for j in self.sources[i]:
+                remaining[j] -= 1
+                if remaining[j] == 0:
+                    values[j] = None
+                    if measure: live -= self.order[j]._nbytes
+        if verbose: print()
+
+        if measure:
+            self.peak = peak
+            if verbose: print(f"Peak: {peak} bytes, predicted: {self.predicted_peak} bytes")
+            if self.estimate_nbytes() != self.nbytes: # schedule the next evaluation by the measured sizes
+                self.schedule_memory()
+        return self.results(values)
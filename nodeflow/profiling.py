@@ -0,0 +1,120 @@
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from collections import defaultdict
+import json
+import threading
+
+from . import events
+from .storage import sizeof
+
+
+@dataclass
+class Record:
+    """a single operator call"""
+    name: str
+    operator: str # class name
+    start: float # seconds, perf_counter
+    wall: float # seconds
+    cpu: Optional[float] # thread cpu seconds, None when not measured on the calling thread
+    pid: int
+    thread: str
+    output: str # type name of the result
+    nbytes: int
+
+
+class Profile:
+    """
+    Record every operator call while active
+      wall and cpu time, thread and process, output type and size
+
+    usage:
+      with Profile() as profile:
+          root.evaluate()
+      print(profile.summary())
+      profile.save("trace.json") # open in chrome://tracing or https://ui.perfetto.dev
+
+    A listener of the NodeFinished events, see nodeflow.events. Operators evaluated in
+    a ProcessExecutor worker are timed in the worker, and recorded with its pid and thread.
+    """
+    def __init__(self):
+        self.records: List[Record] = []
+        self._lock = threading.Lock()
+        self._unsubscribe = None
+
+    def __enter__(self)->"Profile":
+        self._unsubscribe = events.subscribe(self.on_finished, events.NodeFinished)
+        return self
+
+    def __exit__(self, *exc):
+        self._unsubscribe()
+
+    def on_finished(self, event:events.NodeFinished):
+        record = Record(
+            name=repr(event.node),
+            operator=event.node.__class__.__name__,
+            start=event.start,
+            wall=event.wall,
+            cpu=event.cpu,
+            pid=event.pid,
+            thread=event.thread,
+            output=type(event.value).__name__,
+            nbytes=sizeof(event.value)
+        )
+        with self._lock:
+            self.records.append(record)
+
+    def chrome_trace(self)->Dict[str, Any]:
+        """the records as trace events, see the Trace Event Format"""
+        with self._lock:
+            records = list(self.records)
+        origin = min((r.start for r in records), default=0.0)
+        threads: Dict[str, int] = dict()
+        trace = []
+        for r in records:
+            tid = threads.setdefault(r.thread, len(threads))
+            trace.append({
+                "name": r.name,
+                "cat": r.operator,
+                "ph": "X",
+                "ts": (r.start-origin)*1e6,
+                "dur": r.wall*1e6,
+                "pid": r.pid,
+                "tid": tid,
+                "args": {"cpu_ms": None if r.cpu is None else r.cpu*1e3, "output": r.output, "nbytes": r.nbytes}
+            })
+        pids = set(r.pid for r in records)
+        for thread, tid in threads.items():
+            for pid in pids:
+                trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def save(self, path:str):
+        """write the chrome trace json"""
+        with open(path, "w") as file:
+            json.dump(self.chrome_trace(), file)
+
+    def totals(self, by:str="operator")->Dict[str, Dict[str, float]]:
+        """calls, wall and cpu seconds, and the largest output per operator class or per node ("name")"""
+        totals = defaultdict(lambda: {"calls": 0, "wall": 0.0, "cpu": 0.0, "nbytes": 0})
+        with self._lock:
+            records = list(self.records)
+        for r in records:
+            total = totals[getattr(r, by)]
+            total["calls"] += 1
+            total["wall"] += r.wall
+            total["cpu"] += r.cpu or 0.0
+            total["nbytes"] = max(total["nbytes"], r.nbytes)
+        return dict(totals)
+
+    def summary(self, by:str="operator")->str:
+        """a table of the totals, slowest first"""
+        totals = sorted(self.totals(by).items(), key=lambda item: item[1]["wall"], reverse=True)
+        width = max([len(by)] + [len(name) for name, _ in totals])
+        lines = [f"{by:<{width}} | {'calls':>7} | {'wall ms':>10} | {'mean ms':>10} | {'cpu ms':>10} | {'max bytes':>12}"]
+        lines.append("-" * len(lines[0]))
+        for name, t in totals:
+            lines.append(f"{name:<{width}} | {t['calls']:>7} | {t['wall']*1e3:>10.3f} | {t['wall']*1e3/t['calls']:>10.3f} | {t['cpu']*1e3:>10.3f} | {t['nbytes']:>12}")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"Profile({len(self.records)} records)"
@@ -0,0 +1,123 @@
+from typing import Any, Hashable, Dict
+from collections import OrderedDict, Counter
+import threading
+import sys
+
+from . import events
+
+
+def sizeof(value:Any)->int:
+    """memory footprint of a value in bytes, ndarray.nbytes aware"""
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Byte budgeted result cache
+      budget: memory budget in bytes, None for unbounded
+      policy: eviction policy, "lru" (least recently used) or "lfu" (least frequently used)
+
+    Several Cache operators can share a single instance, and with it the budget.
+    Access is thread-safe.
+    """
+    POLICIES = ("lru", "lfu")
+
+    def __init__(self, budget:int=None, policy:str="lru"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"unknown eviction policy: {policy}, use one of {self.POLICIES}")
+        self.budget = budget
+        self.policy = policy
+
+        self._entries: Dict[Hashable, Any] = OrderedDict() # key: (value, nbytes), least recent first
+        self._frequency = Counter()
+        self._lock = threading.RLock()
+        self.nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key:Hashable)->bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key:Hashable, default:Any=None)->Any:
+        """look up a result, counting hits and misses"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._touch(key)
+            return self._entries[key][0]
+
+    def peek(self, key:Hashable, default:Any=None)->Any:
+        """look up a result without counting or touching it"""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            return self._entries[key][0]
+
+    def put(self, key:Hashable, value:Any):
+        """store a result, evicting others until it fits the budget"""
+        nbytes = sizeof(value)
+        with self._lock:
+            self.discard(key)
+            if self.budget is not None and nbytes > self.budget:
+                return # would never fit
+
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            self._touch(key)
+            while self.budget is not None and self.nbytes > self.budget:
+                self._evict(keep=key)
+
+    def discard(self, key:Hashable):
+        with self._lock:
+            if key in self._entries:
+                value, nbytes = self._entries.pop(key)
+                self.nbytes -= nbytes
+                del self._frequency[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._frequency.clear()
+            self.nbytes = 0
+
+    def stats(self)->Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "nbytes": self.nbytes,
+                "budget": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _touch(self, key:Hashable):
+        self._entries.move_to_end(key)
+        self._frequency[key] += 1
+
+    def _evict(self, keep:Hashable):
+        """evict one entry other than the one being stored"""
+        candidates = (key for key in self._entries if key != keep)
+        if self.policy == "lru":
+            key = next(candidates)
+        else: # lfu, ties are broken by recency
+            key = min(candidates, key=self._frequency.__getitem__)
+        nbytes = self._entries[key][1]
+        self.discard(key)
+        self.evictions += 1
+        if events.listening: events.emit(events.Eviction(self, key, nbytes))
+
+    def __repr__(self):
+        return f"ResultCache({self.nbytes}/{self.budget} bytes, {len(self)} entries, {self.policy})"
@@ -0,0 +1,220 @@
+from typing import Any, Dict, Generator, List, Sequence, Tuple
+from concurrent.futures import Executor, wait, FIRST_COMPLETED
+import itertools
+import os
+import threading
+
+from . import events
+from .plan import EvaluationPlan, Thunk
+from .core import Operator, Variable, Cache
+
+
+class _Pending:
+    """a result being computed by another combination"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def result(self)->Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class Sweep:
+    """
+    Evaluate a graph for every combination of values of Variables
+      values: {variable: values}, the first variable varies slowest
+
+    The result of an operator depending on some of the variables only is computed once per
+    combination of their values and reused across the other dimensions, eg.: a blur depending
+    on the radius only is computed once per radius, not once per (radius, mix, frame).
+    Operators depending on no variable are evaluated as usual, operators depending on all
+    of them are computed for each combination and not kept. Combinations may be evaluated
+    from several threads, each result is computed once. run() drops a result from memo once
+    the last combination of its values is done. The variables are left untouched,
+    Cache operators pass their source through.
+    """
+    def __init__(self, root:Operator, values:Dict[Variable, Sequence]):
+        for var in values:
+            if not isinstance(var, Variable):
+                raise TypeError(f"only Variables can be swept, got: {var!r}")
+        self.root = root
+        self.variables: List[Variable] = list(values)
+        self.values: List[List[Any]] = [list(v) for v in values.values()]
+        self.plan: EvaluationPlan = root.plan(static=True)
+
+        # the dimensions each node depends on
+        plan_variables, masks = self.plan.variable_masks()
+        bit = {var: b for b, var in enumerate(plan_variables)}
+        self.dims: List[Tuple[int, ...]] = [
+            tuple(d for d, var in enumerate(self.variables) if var in bit and mask >> bit[var] & 1)
+            for mask in masks
+        ]
+        self.memo: Dict[Tuple[int, Tuple[int, ...]], Any] = dict() # (node, value indices): result
+        # the nodes whose results are kept, and the combinations sharing each of their results
+        memoized = [
+            j for j, d in enumerate(self.dims) if 0 < len(d) < len(self.variables) and self.plan.order[j] not in self.variables
+        ]
+        self._sharing: Dict[int, int] = {j: len(self) // self._count(self.dims[j]) for j in memoized}
+        self._remaining: Dict[Tuple[int, Tuple[int, ...]], int] = dict() # combinations not done yet
+        self._lock = threading.Lock()
+        self._graph_lock = threading.Lock() # the shared graph evaluates one node at a time
+
+    def __len__(self):
+        return self._count(range(len(self.values)))
+
+    def _count(self, dims)->int:
+        count = 1
+        for d in dims:
+            count *= len(self.values[d])
+        return count
+
+    def combinations(self)->Generator[Tuple[int, ...], None, None]:
+        """the value indices of every combination, the first dimension varies slowest"""
+        return itertools.product(*(range(len(values)) for values in self.values))
+
+    def evaluate(self, combination:Tuple[int, ...])->Any:
+        """the result of the root for the combination of value indices"""
+        return self._value(self.plan.index[self.root], combination)
+
+    def _value(self, i:int, combination:Tuple[int, ...])->Any:
+        plan = self.plan
+        order, dims = plan.order, self.dims
+        everything = len(self.variables)
+        known: Dict[int, Any] = dict()
+        waiting: Dict[int, _Pending] = dict() # computed by other combinations
+        claimed: Dict[int, _Pending] = dict() # computed here for the others
+
+        # walk back from the node, stopping at results known or claimed by other combinations
+        needed = {i}
+        schedule: List[int] = []
+        for j in reversed(range(i+1)):
+            if j not in needed:
+                continue
+            N = order[j]
+            d = dims[j]
+            if N in self.variables and len(d) == 1:
+                known[j] = self.values[d[0]][combination[d[0]]]
+                continue
+            if not d:
+                known[j] = self._shared(j)
+                continue
+            if len(d) < everything:
+                key = (j, tuple(combination[k] for k in d))
+                with self._lock:
+                    if key in self.memo:
+                        entry = self.memo[key]
+                    else:
+                        entry = claimed[j] = self.memo[key] = _Pending()
+                if j not in claimed:
+                    if isinstance(entry, _Pending):
+                        waiting[j] = entry
+                    else:
+                        known[j] = entry
+                    continue
+            lazy = N.lazy
+            needed.update(k for pos, k in enumerate(plan.slots[j]) if pos not in lazy)
+            schedule.append(j)
+
+        # results are computed in plan order, waiting on lower nodes only: no deadlock between combinations
+        try:
+            for j in reversed(schedule):
+                N = order[j]
+                args = []
+                for pos, k in enumerate(plan.slots[j]):
+                    if pos in N.lazy:
+                        args.append(Thunk(lambda k=k: self._value(k, combination)))
+                    elif k in waiting:
+                        args.append(waiting[k].result())
+                    else:
+                        args.append(known[k])
+                if isinstance(N, Cache):
+                    value = args[0]
+                else:
+                    value = events.call(N, args) if events.listening else N(*args)
+                known[j] = value
+                if j in claimed:
+                    with self._lock:
+                        self.memo[(j, tuple(combination[k] for k in dims[j]))] = value
+                    entry = claimed.pop(j)
+                    entry.value = value
+                    entry.done.set()
+        except BaseException as err:
+            with self._lock: # forget the unfinished claims, their waiters raise too
+                for j, entry in claimed.items():
+                    self.memo.pop((j, tuple(combination[k] for k in dims[j])), None)
+                    entry.error = err
+                    entry.done.set()
+            raise
+        return waiting[i].result() if i in waiting else known[i]
+
+    def _done(self, combination:Tuple[int, ...]):
+        """forget the results no other combination uses"""
+        dims = self.dims
+        with self._lock:
+            for j, sharing in self._sharing.items():
+                key = (j, tuple(combination[k] for k in dims[j]))
+                remaining = self._remaining.get(key, sharing) - 1
+                if remaining:
+                    self._remaining[key] = remaining
+                else:
+                    self._remaining.pop(key, None)
+                    self.memo.pop(key, None)
+
+    def _shared(self, i:int)->Any:
+        with self._graph_lock:
+            return self.plan.order[i].evaluate()
+
+    def run(self, executor:Executor=None, readahead:int=None)->Generator[Tuple[Dict[Variable, Any], Any], None, None]:
+        """
+        yield ({variable: value}, result) for every combination
+          executor:  evaluate combinations concurrently, eg.: a ThreadPoolExecutor,
+                     results are yielded as they finish
+          readahead: combinations submitted ahead of the consumer, 2 per cpu by default
+        """
+        def point(combination):
+            return {var: values[k] for var, values, k in zip(self.variables, self.values, combination)}
+
+        if executor is None:
+            for combination in self.combinations():
+                result = self.evaluate(combination)
+                self._done(combination)
+                yield point(combination), result
+            return
+
+        readahead = readahead or 2 * (os.cpu_count() or 1)
+        combinations = self.combinations()
+        futures = dict()
+        try:
+            while True:
+                for combination in itertools.islice(combinations, readahead - len(futures)):
+                    futures[executor.submit(self.evaluate, combination)] = combination
+                if not futures:
+                    return
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    combination = futures.pop(future)
+                    result = future.result()
+                    self._done(combination)
+                    yield point(combination), result
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def __repr__(self):
+        return "Sweep({}, {})".format(self.root, ", ".join(f"{var!r}: {len(values)} values" for var, values in zip(self.variables, self.values)))
+
+
+def sweep(root:Operator, values:Dict[Variable, Sequence], executor:Executor=None, readahead:int=None)->Generator[Tuple[Dict[Variable, Any], Any], None, None]:
+    """
+    Evaluate the root for the cartesian product of the values of the variables,
+    yielding ({variable: value}, result) as the combinations finish, see Sweep
+
+    usage:
+      for point, image in nodeflow.sweep(root, {radius: [1, 2, 4], mix: [0, 0.5, 1]}, executor=pool):
+          ...
+    """
+    return Sweep(root, values).run(executor=executor, readahead=readahead)
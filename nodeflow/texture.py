@@ -100,6 +100,9 @@ class ApplyShader(Operator):
         self.init_shaders()
         self.init_quad()
 
+    def params(self):
+        return (self.fragment_code, self.viewport)
+
     def init_texture(self):
         self.tex = glGenTextures(1)
         glBindTexture(GL_TEXTURE_2D, self.tex)
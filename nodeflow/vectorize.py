@@ -0,0 +1,116 @@
+from typing import Any, Dict, List
+import warnings
+import numpy as np
+
+from . import events
+from .plan import EvaluationPlan, Thunk
+from .core import Operator, Variable, Cache
+
+
+class FallbackWarning(RuntimeWarning):
+    """an operator that is not broadcast safe was evaluated once per element"""
+
+
+class VectorizedEvaluation:
+    """
+    Evaluate a graph for N values of Variables in one pass
+      overrides: {variable: array of N values}, the variables themselves are left untouched
+
+    Results depending on the overridden variables are arrays of N results along the first axis.
+    Operators declaring broadcast_safe are called once with the arrays (N on the first axis, ones inserted
+    after it up to the rank of the other inputs), the others once per element
+    (reported by a FallbackWarning and a Fallback event, and listed in fallbacks).
+    The inputs not depending on the variables are evaluated as usual, keeping their outputs.
+    Cache operators pass their source through, lazy inputs are evaluated for all elements when called.
+    """
+    def __init__(self, root:Operator, overrides:Dict[Variable, Any]):
+        for var in overrides:
+            if not isinstance(var, Variable):
+                raise TypeError(f"only Variables can be vectorized, got: {var!r}")
+        self.root = root
+        self.overrides = {var: np.asarray(values) for var, values in overrides.items()}
+        sizes = set(len(values) for values in self.overrides.values())
+        if len(sizes) != 1:
+            raise ValueError(f"pass arrays of one size, got: {sorted(sizes)}")
+        self.size = sizes.pop()
+        self.plan: EvaluationPlan = root.plan(static=True)
+        self.values: Dict[int, Any] = dict()
+        self.fallbacks: List[Operator] = []
+
+    def evaluate(self, verbose=False)->np.ndarray:
+        plan = self.plan
+        i = plan.index[self.root]
+        if i not in plan.affected(self.overrides):
+            return np.array([self.root.evaluate()] * self.size)
+        return self._value(i, verbose)
+
+    def _value(self, i:int, verbose=False)->Any:
+        """the result of the i-th operator of the plan, evaluating its missing upstream"""
+        plan = self.plan
+        order = plan.order
+        affected = plan.affected(self.overrides)
+        values = self.values
+
+        # walk back from the node, stopping at known results and at the inputs independent of the variables
+        needed = {i}
+        schedule: List[int] = []
+        for j in reversed(range(i+1)):
+            if j not in needed or j in values:
+                continue
+            N = order[j]
+            if N in self.overrides:
+                values[j] = self.overrides[N]
+            elif j not in affected:
+                values[j] = N.evaluate()
+            else:
+                lazy = N.lazy
+                needed.update(k for pos, k in enumerate(plan.slots[j]) if pos not in lazy)
+                schedule.append(j)
+
+        for j in reversed(schedule):
+            N = order[j]
+            slots = plan.slots[j]
+            if isinstance(N, Cache):
+                values[j] = values[slots[0]]
+                continue
+            if N.broadcast_safe and not N.lazy:
+                if verbose: print(f"  broadcast: {N}")
+                args = self._aligned([values[k] for k in slots], [k in affected for k in slots])
+                values[j] = events.call(N, args) if events.listening else N(*args)
+                continue
+
+            if verbose: print(f"  per element: {N}")
+            self.fallbacks.append(N)
+            warnings.warn(f"{N} is not broadcast safe, evaluated {self.size} times", FallbackWarning, stacklevel=4)
+            if events.listening: events.emit(events.Fallback(N, self.size))
+            results = []
+            for element in range(self.size):
+                args = []
+                for pos, k in enumerate(slots):
+                    if pos in N.lazy:
+                        args.append(Thunk(lambda k=k, element=element: self._element(k, element)))
+                    else:
+                        args.append(values[k][element] if k in affected else values[k])
+                results.append(events.call(N, args) if events.listening else N(*args))
+            values[j] = np.array(results)
+        return values[i]
+
+    @staticmethod
+    def _aligned(args:List[Any], swept:List[bool])->List[Any]:
+        """
+        the arrays of N results with ones inserted after the first axis, up to the largest rank of an
+        element: N stays on the first axis when broadcast against the inputs independent of the variables
+        """
+        rank = max(np.ndim(arg) - 1 if s else np.ndim(arg) for arg, s in zip(args, swept))
+        return [
+            arg.reshape(arg.shape[:1] + (1,) * (rank - arg.ndim + 1) + arg.shape[1:]) if s and arg.ndim <= rank else arg
+            for arg, s in zip(args, swept)
+        ]
+
+    def _element(self, i:int, element:int)->Any:
+        if i not in self.plan.affected(self.overrides):
+            return self.plan.order[i].evaluate()
+        return self._value(i)[element]
+
+    def __repr__(self):
+        return f"VectorizedEvaluation({self.root}, {self.size} elements)"
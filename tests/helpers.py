@@ -0,0 +1,38 @@
+import threading
+from nodeflow import Operator
+
+
+class Counted(Operator):
+    """sums its arguments, counting the calls"""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self.lock:
+            self.calls += 1
+        return sum(args)
+
+
+class CountedValue(Operator):
+    """a value, eg.: a frame, counting the calls"""
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class Meet(Operator):
+    """waits for the other branches at a barrier, only completes when run concurrently"""
+    def __init__(self, x:Operator, barrier:threading.Barrier):
+        super().__init__(x)
+        self.barrier = barrier
+
+    def __call__(self, x):
+        self.barrier.wait()
+        return x
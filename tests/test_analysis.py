@@ -0,0 +1,61 @@
+import unittest
+from nodeflow import Operator, Constant, Variable, Cache
+from nodeflow.analysis import variable_dependencies, static_graph, invariant
+from helpers import Counted
+
+
+class VariableDependencies(unittest.TestCase):
+    def setUp(self):
+        self.frame = Variable(1)
+        self.gain = Variable(2)
+        self.frame_branch = Counted(self.frame)
+        self.static_branch = Counted(Constant(10))
+        self.root = Counted(self.frame_branch, self.static_branch, self.gain)
+
+    def test_tags(self):
+        tags = variable_dependencies(self.root.graph())
+        self.assertEqual(tags[self.frame], {self.frame})
+        self.assertEqual(tags[self.frame_branch], {self.frame})
+        self.assertEqual(tags[self.static_branch], frozenset())
+        self.assertEqual(tags[self.root], {self.frame, self.gain})
+
+    def test_invariant(self):
+        self.assertIn(self.static_branch, invariant(self.root.graph()))
+        self.assertNotIn(self.frame_branch, invariant(self.root.graph()))
+
+    def test_static_graph_includes_cache_hits(self):
+        cached = Cache(self.frame_branch)
+        cached.evaluate()
+        self.assertEqual(cached.graph()[cached], [])
+        self.assertEqual(variable_dependencies(static_graph(cached))[cached], {self.frame})
+
+    def test_plan_variables(self):
+        plan = self.root.plan(static=True)
+        variables = plan.variables()
+        self.assertEqual(variables[plan.index[self.static_branch]], frozenset())
+        self.assertEqual(plan.affected([self.gain]), {plan.index[self.gain], plan.index[self.root]})
+
+
+class InvariantResults(unittest.TestCase):
+    def setUp(self):
+        self.frame = Variable(1)
+        self.frame_branch = Counted(self.frame)
+        self.static_branch = Counted(Constant(10))
+        self.root = Counted(self.frame_branch, self.static_branch)
+
+    def test_shared_across_contexts(self):
+        for frame in range(5):
+            self.assertEqual(self.root.evaluate(overrides={self.frame: frame}), frame+10)
+        self.assertEqual(self.static_branch.calls, 1)
+        self.assertEqual(self.frame_branch.calls, 5)
+        self.assertTrue(self.static_branch.is_dirty()) # the graph itself is untouched
+
+    def test_forgotten_on_change(self):
+        self.root.evaluate(overrides={self.frame: 2})
+        self.static_branch.set_inputs(Constant(20))
+        self.assertEqual(self.root.evaluate(overrides={self.frame: 2}), 22)
+        self.assertEqual(self.static_branch.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import nodeflow as nf
+import unittest
+import asyncio
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StandInServer(ThreadingHTTPServer):
+    """local stand-in for a remote server, answers every path after a delay"""
+    def __init__(self, delay:float=0.1):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.requests = 0
+
+    def url(self, path:str)->str:
+        host, port = self.server_address
+        return f"http://{host}:{port}{path}"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Request(nf.Operator):
+    """blocking request"""
+    def __init__(self, url:nf.Operator):
+        super().__init__(url)
+
+    def __call__(self, url):
+        with urllib.request.urlopen(url) as response:
+            return response.read().decode()
+
+
+class AsyncRequest(nf.Operator):
+    """request on the event loop"""
+    def __init__(self, url:nf.Operator):
+        super().__init__(url)
+
+    async def __call__(self, url):
+        host, port = url.split("/")[2].split(":")
+        path = "/" + url.split("/", 3)[3]
+        reader, writer = await asyncio.open_connection(host, int(port))
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: {host}\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return response.split(b"\r\n\r\n", 1)[1].decode()
+
+
+class LimitedRequest(Request):
+    concurrency = 1
+
+
+@nf.operator
+def Join(*texts):
+    return ",".join(texts)
+
+
+class AsyncEvaluation(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def urls(self, count:int):
+        return [nf.Constant(self.server.url(f"/{i}")) for i in range(count)]
+
+    def test_async_operators_are_gathered(self):
+        root = Join(*(AsyncRequest(url) for url in self.urls(4)))
+        self.assertEqual(asyncio.run(root.evaluate_async()), "/0,/1,/2,/3")
+        self.assertGreater(self.server.max_active, 1)
+
+    def test_sync_operators_are_offloaded(self):
+        root = Join(*(Request(url) for url in self.urls(4)))
+        self.assertEqual(asyncio.run(root.evaluate_async()), "/0,/1,/2,/3")
+        self.assertGreater(self.server.max_active, 1)
+
+    def test_concurrency_limit(self):
+        root = Join(*(LimitedRequest(url) for url in self.urls(3)))
+        self.assertEqual(asyncio.run(root.evaluate_async()), "/0,/1,/2")
+        self.assertEqual(self.server.max_active, 1)
+
+    def test_incremental(self):
+        path = nf.Variable(self.server.url("/a"))
+        root = Join(AsyncRequest(path), Request(nf.Constant(self.server.url("/b"))))
+        self.assertEqual(asyncio.run(root.evaluate_async()), "/a,/b")
+        path.value = self.server.url("/c")
+        self.assertEqual(asyncio.run(root.evaluate_async()), "/c,/b")
+        self.assertEqual(self.server.requests, 3)
+
+    def test_async_function_operator(self):
+        @nf.operator
+        async def Later(x):
+            await asyncio.sleep(0)
+            return x+1
+        self.assertEqual(asyncio.run(Later(nf.Constant(1)).evaluate_async()), 2)
+
+
+class Later(nf.Operator):
+    async def __call__(self, x):
+        await asyncio.sleep(0)
+        return x+1
+
+
+class AsyncFirst(nf.Operator):
+    """awaits its lazy input"""
+    lazy = (0,)
+    async def __call__(self, A):
+        return await A()
+
+
+class AsyncInSyncEvaluation(unittest.TestCase):
+    def test_sync_evaluation_raises(self):
+        later = Later(nf.Constant(1))
+        with self.assertRaises(TypeError):
+            later.evaluate()
+        with self.assertRaises(TypeError):
+            later.evaluate(incremental=False)
+        self.assertTrue(later.is_dirty())
+        self.assertEqual(asyncio.run(later.evaluate_async()), 2)
+
+    def test_lazy_inputs(self):
+        switch = nf.Switch(nf.Constant(0), Later(nf.Constant(1)))
+        with self.assertRaises(TypeError):
+            switch.evaluate()
+        with self.assertRaises(TypeError):
+            switch.evaluate(incremental=False)
+        self.assertEqual(asyncio.run(switch.evaluate_async()), 2)
+        self.assertEqual(asyncio.run(AsyncFirst(Later(nf.Constant(2))).evaluate_async()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
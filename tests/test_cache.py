@@ -2,6 +2,9 @@ import nodeflow as nf
 
 import requests
 import unittest
+import threading
+import numpy as np
+from nodeflow.storage import ResultCache
 
 class Request(nf.Operator):
     def __init__(self, url: nf.Constant):
@@ -35,5 +38,98 @@ class CacheOperator(unittest.TestCase):
         self.assertEqual(requests.get(url.value).text[:10], result[:10])
 
 
+class Frame(nf.Operator):
+    """a 1kb frame, counting the calls"""
+    def __init__(self, F:nf.Operator):
+        super().__init__(F)
+        self.calls = 0
+
+    def __call__(self, F):
+        self.calls += 1
+        return np.full(shape=(256,), fill_value=F, dtype=np.float32)
+
+
+class ResultCacheBudget(unittest.TestCase):
+    def test_lru_eviction(self):
+        store = ResultCache(budget=2048)
+        store.put("a", np.zeros(256, dtype=np.float32))
+        store.put("b", np.zeros(256, dtype=np.float32))
+        store.get("a")
+        store.put("c", np.zeros(256, dtype=np.float32))
+        self.assertIn("a", store)
+        self.assertNotIn("b", store)
+        self.assertEqual(store.nbytes, 2048)
+        self.assertEqual(store.stats()["evictions"], 1)
+
+    def test_lfu_eviction(self):
+        store = ResultCache(budget=2048, policy="lfu")
+        store.put("a", np.zeros(256, dtype=np.float32))
+        store.put("b", np.zeros(256, dtype=np.float32))
+        store.get("b")
+        store.get("b")
+        store.get("a")
+        store.put("c", np.zeros(256, dtype=np.float32))
+        self.assertNotIn("a", store)
+        self.assertIn("b", store)
+
+    def test_too_large_is_not_cached(self):
+        store = ResultCache(budget=100)
+        store.put("a", np.zeros(256, dtype=np.float32))
+        self.assertEqual(len(store), 0)
+
+    def test_counters(self):
+        store = ResultCache()
+        store.put("a", 1)
+        store.get("a")
+        store.get("b")
+        stats = store.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_thread_safety(self):
+        store = ResultCache(budget=64*1024)
+        def work(offset):
+            for i in range(200):
+                store.put((offset, i), np.zeros(256, dtype=np.float32))
+                store.get((offset, i-1))
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.assertLessEqual(store.nbytes, 64*1024)
+        self.assertEqual(store.nbytes, 1024*len(store))
+
+
+class CacheOperatorStore(unittest.TestCase):
+    def test_cache_hit_skips_source(self):
+        F = nf.Variable(1)
+        frame = Frame(F)
+        cached = nf.Cache(frame)
+        cached.evaluate()
+        F.value = 2
+        cached.evaluate()
+        F.value = 1
+        self.assertEqual(cached.evaluate()[0], 1)
+        self.assertEqual(frame.calls, 2)
+        self.assertEqual(cached.store.stats()["hits"], 1)
+
+        cached.evaluate() # clean, not looked up
+        self.assertEqual(cached.store.stats()["hits"], 1)
+        cached.store.clear()
+        self.assertEqual(cached.evaluate()[0], 1)
+        self.assertEqual(cached.store.stats()["hits"], 1)
+
+    def test_shared_budget(self):
+        store = ResultCache(budget=4096)
+        F = nf.Variable(0)
+        a = nf.Cache(Frame(F), store=store)
+        b = nf.Cache(Frame(nf.Plus(F, nf.Constant(100))), store=store)
+        for frame in range(10):
+            F.value = frame
+            a.evaluate()
+            b.evaluate()
+        self.assertEqual(len(store), 4)
+        self.assertLessEqual(store.nbytes, 4096)
+        self.assertEqual(store.stats()["evictions"], 16)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file
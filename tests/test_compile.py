@@ -0,0 +1,70 @@
+import unittest
+import nodeflow as nf
+from nodeflow import Operator, Constant, Variable, Cache, Switch
+from helpers import Counted
+
+
+class Compile(unittest.TestCase):
+    def setUp(self):
+        self.x = Variable(2)
+        self.y = Variable(3)
+        self.root = nf.Multiply(nf.Plus(self.x, Constant(1)), nf.Minus(self.y, self.x))
+
+    def test_same_result_as_evaluate(self):
+        f = self.root.compile()
+        self.assertEqual(f.variables, [self.x, self.y])
+        self.assertEqual(f(), self.root.evaluate())
+        self.assertEqual(f(5), 6*-2)
+        self.assertEqual(f(5, 10), 6*5)
+        self.assertEqual(f.call({self.y: 10}), 3*8)
+
+    def test_variables_are_not_assigned(self):
+        self.root.evaluate()
+        self.root.compile()(5, 10)
+        self.assertEqual(self.x.value, 2)
+        self.assertFalse(self.root.is_dirty())
+
+    def test_regenerated_on_structural_change(self):
+        f = self.root.compile()
+        source = f.source
+        self.x.value = 4
+        self.assertEqual(f(), -5)
+        self.assertIs(f.source, source)
+
+        Constant(0).set_inputs() # other graphs do not regenerate
+        self.assertEqual(f(), -5)
+        self.assertIs(f.source, source)
+
+        self.root.set_inputs(self.x, self.y)
+        self.assertEqual(f(), 12)
+        self.assertIsNot(f.source, source)
+        self.assertIs(self.root.compile(), f)
+
+    def test_shared_inputs_are_called_once(self):
+        shared = Counted(self.x)
+        root = Counted(shared, Counted(shared))
+        self.assertEqual(root.compile()(1), 2)
+        self.assertEqual(shared.calls, 1)
+
+    def test_lazy_inputs(self):
+        a, b = Counted(self.x), Counted(self.y)
+        index = Variable(0)
+        f = Switch(index, a, b).compile()
+        self.assertEqual(f.call({index: 1}), 3)
+        self.assertEqual((a.calls, b.calls), (0, 1))
+        self.assertEqual(f.call({index: 0}), 2)
+        self.assertEqual((a.calls, b.calls), (1, 1))
+
+    def test_cache_passes_through(self):
+        self.assertEqual(Cache(self.root).compile()(5, 10), 30)
+
+    def test_async_operators(self):
+        @nf.operator
+        async def wait(x):
+            return x
+        with self.assertRaises(TypeError):
+            wait(self.x).compile()
+
+
+if __name__ == '__main__':
+    unittest.main()
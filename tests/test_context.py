@@ -0,0 +1,80 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from nodeflow import Operator, Constant, Variable, Cache, ResultCache, EvaluationContext
+from helpers import Counted
+
+
+class Overrides(unittest.TestCase):
+    def setUp(self):
+        self.frame = Variable(1)
+        self.frame_branch = Counted(self.frame)
+        self.static_branch = Counted(Constant(10))
+        self.root = Counted(self.frame_branch, self.static_branch)
+
+    def test_variable_is_not_assigned(self):
+        self.assertEqual(self.root.evaluate(overrides={self.frame: 5}), 15)
+        self.assertEqual(self.frame.value, 1)
+        self.assertEqual(self.root.evaluate(), 11)
+
+    def test_only_variables(self):
+        with self.assertRaises(TypeError):
+            EvaluationContext({self.static_branch: 1})
+
+    def test_clean_outputs_are_shared(self):
+        self.root.evaluate()
+        self.root.evaluate(overrides={self.frame: 2})
+        self.root.evaluate(overrides={self.frame: 3})
+        self.assertEqual(self.static_branch.calls, 1)
+        self.assertEqual(self.frame_branch.calls, 3)
+
+    def test_context_keeps_results(self):
+        context = EvaluationContext({self.frame: 2})
+        self.assertEqual(self.root.evaluate(context=context), 12)
+        self.assertEqual(self.root.evaluate(context=context), 12)
+        self.assertEqual(self.root.calls, 1)
+
+        self.static_branch.set_inputs(Constant(20))
+        self.assertEqual(self.root.evaluate(context=context), 22)
+        self.assertEqual(self.root.calls, 2)
+
+    def test_unrelated_changes_keep_results(self):
+        context = EvaluationContext({self.frame: 2})
+        other = Variable(0)
+        self.assertEqual(self.root.evaluate(context=context), 12)
+        Constant(123)
+        other.value = 1
+        self.assertEqual(self.root.evaluate(context=context), 12)
+        self.assertEqual(self.root.calls, 1)
+        self.assertEqual(self.root.evaluate(overrides={self.frame: 3}), 13)
+        self.assertEqual(self.static_branch.calls, 1) # shared by the contexts
+
+        # a change in the first graph, while evaluating another one
+        other_root = Counted(other)
+        self.assertEqual(other_root.evaluate(context=context), 1)
+        self.static_branch.inputs()[0].value = 20
+        self.assertEqual(other_root.evaluate(context=context), 1)
+        self.assertEqual(self.root.evaluate(context=context), 22)
+
+    def test_concurrent_contexts(self):
+        frames = range(100)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda f: self.root.evaluate(overrides={self.frame: f}), frames))
+        self.assertEqual(results, [f+10 for f in frames])
+        self.assertEqual(self.frame.value, 1)
+
+    def test_cache_is_keyed_by_context(self):
+        store = ResultCache()
+        cached = Cache(self.frame_branch, store=store)
+        self.assertEqual(cached.evaluate(overrides={self.frame: 2}), 2)
+        self.assertEqual(cached.evaluate(overrides={self.frame: 3}), 3)
+        self.assertEqual(cached.evaluate(overrides={self.frame: 2}), 2)
+        self.assertEqual(self.frame_branch.calls, 2)
+
+        # the same entry as assigning the variable
+        self.frame.value = 3
+        self.assertEqual(cached.evaluate(), 3)
+        self.assertEqual(self.frame_branch.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
 import unittest
-from nodeflow import Operator, Constant, Variable, Cache, operator
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from nodeflow import Operator, Constant, Variable, Cache, Switch, operator, evaluate_many
+from nodeflow.graph_helpers import dependency_order, CycleError, CSRGraph
+from nodeflow.plan import dirty_operators
+from helpers import Counted, Meet
 
 class Add(Operator):
     def __init__(self, A=Constant(0), B=Constant(0)):
@@ -54,5 +60,555 @@ class ReconnectInputs(unittest.TestCase):
         self.assertEqual(add.evaluate(), 9)
 
 
+class Subtract(Operator):
+    def __init__(self, A, B):
+        super().__init__(A, B)
+
+    def __call__(self, a, b):
+        return a-b
+
+
+class EvaluationPlanReuse(unittest.TestCase):
+    def test_plan_is_reused(self):
+        add = Add(Constant(1), Constant(2))
+        plan = add.plan()
+        self.assertEqual(add.evaluate(), 3)
+        self.assertEqual(add.evaluate(), 3)
+        self.assertIs(add.plan(), plan)
+
+    def test_set_inputs_invalidates_plan(self):
+        add = Add(Constant(1), Constant(2))
+        plan = add.plan()
+        add.set_inputs(Constant(3), Constant(4))
+        self.assertIsNot(add.plan(), plan)
+        self.assertEqual(add.evaluate(), 7)
+
+    def test_argument_order(self):
+        five = Constant(5)
+        one = Constant(1)
+        self.assertEqual(Subtract(five, one).evaluate(), 4)
+        self.assertEqual(Subtract(one, five).evaluate(), -4)
+
+    def test_shared_dependency(self):
+        one = Constant(1)
+        plus = Add(one, one)
+        twice = Add(plus, plus)
+        self.assertEqual(twice.evaluate(), 4)
+        self.assertEqual(len(twice.plan()), 3)
+
+    def test_cache_dependencies_invalidate_plan(self):
+        x = Variable(1)
+        cached = Cache(Add(x, Constant(1)))
+        self.assertEqual(cached.evaluate(), 2)
+        plan = cached.plan()
+        self.assertEqual(len(plan), 4) # clean, kept after storing the result
+        x.value = 2
+        self.assertEqual(cached.evaluate(), 3)
+        self.assertIs(cached.plan(), plan)
+        x.value = 1
+        self.assertEqual(cached.evaluate(), 2)
+        self.assertIsNot(cached.plan(), plan)
+        self.assertEqual(len(cached.plan()), 1) # source is cached
+
+
+class IncrementalEvaluation(unittest.TestCase):
+    def setUp(self):
+        self.frame = Variable(1)
+        self.frame_branch = Counted(self.frame)
+        self.static_branch = Counted(Constant(10))
+        self.root = Counted(self.frame_branch, self.static_branch)
+
+    def test_clean_graph_is_not_recomputed(self):
+        self.assertEqual(self.root.evaluate(), 11)
+        self.assertEqual(self.root.evaluate(), 11)
+        self.assertEqual(self.root.calls, 1)
+        self.assertFalse(self.root.is_dirty())
+
+    def test_variable_recomputes_dirty_cone_only(self):
+        self.root.evaluate()
+        self.frame.value = 2
+        self.assertTrue(self.root.is_dirty())
+        self.assertFalse(self.static_branch.is_dirty())
+        self.assertEqual(self.root.evaluate(), 12)
+        self.assertEqual(self.frame_branch.calls, 2)
+        self.assertEqual(self.root.calls, 2)
+        self.assertEqual(self.static_branch.calls, 1) # untouched
+
+    def test_set_inputs_marks_dirty(self):
+        self.root.evaluate()
+        self.static_branch.set_inputs(Constant(20))
+        self.assertEqual(self.root.evaluate(), 21)
+        self.assertEqual(self.frame_branch.calls, 1) # untouched
+        self.assertEqual(self.static_branch.calls, 2)
+
+    def test_shared_output_between_roots(self):
+        other = Counted(self.frame_branch)
+        self.root.evaluate()
+        self.assertEqual(other.evaluate(), 1)
+        self.assertEqual(self.frame_branch.calls, 1)
+
+    def test_other_roots_stay_dirty(self):
+        other = Counted(Variable(5))
+        self.root.evaluate()
+        self.frame.value = 2
+        self.assertIn(other, dirty_operators)
+        self.assertEqual(other.evaluate(), 5)
+        self.assertNotIn(other, dirty_operators)
+        self.assertIn(self.frame_branch, dirty_operators)
+        self.assertEqual(self.root.evaluate(), 12)
+        self.assertNotIn(self.frame_branch, dirty_operators)
+
+    def test_non_incremental(self):
+        self.root.evaluate()
+        self.assertEqual(self.root.evaluate(incremental=False), 11)
+        self.assertEqual(self.static_branch.calls, 2)
+
+
+class Clamp(Operator):
+    early_cutoff = "equal"
+    def __init__(self, x, maximum):
+        super().__init__(x)
+        self.maximum = maximum
+        self.calls = 0
+
+    def __call__(self, x):
+        self.calls += 1
+        return min(x, self.maximum)
+
+
+class Pick(Operator):
+    early_cutoff = "equal"
+    def __init__(self, i, values):
+        super().__init__(i)
+        self.values = values
+
+    def __call__(self, i):
+        return self.values[i]
+
+
+class Zeros(Operator):
+    early_cutoff = "hash"
+    def __call__(self, size):
+        return np.zeros(shape=(4, 4))
+
+
+class EarlyCutoff(unittest.TestCase):
+    def test_saturated_clamp_stops_propagation(self):
+        x = Variable(5)
+        clamp = Clamp(x, maximum=3)
+        root = Counted(clamp)
+        self.assertEqual(root.evaluate(), 3)
+        x.value = 6
+        self.assertEqual(root.evaluate(), 3)
+        self.assertEqual(clamp.calls, 2)
+        self.assertEqual(root.calls, 1) # cut off
+        self.assertFalse(root.is_dirty())
+
+        x.value = 2
+        self.assertEqual(root.evaluate(), 2)
+        self.assertEqual(root.calls, 2)
+
+    def test_equal_values_of_other_types_propagate(self):
+        x = Variable(2)
+        clamp = Clamp(x, maximum=3)
+        root = Counted(clamp)
+        root.evaluate()
+        x.value = 2.0
+        self.assertIsInstance(root.evaluate(), float)
+        self.assertEqual(root.calls, 2)
+
+        i = Variable(0)
+        root = Counted(Pick(i, [np.zeros(2, dtype=np.int32), np.zeros(2, dtype=np.float32), np.zeros((1, 2), dtype=np.float32)]))
+        root.evaluate()
+        i.value = 1
+        self.assertEqual(root.evaluate().dtype, np.float32)
+        i.value = 2
+        self.assertEqual(root.evaluate().shape, (1, 2))
+        self.assertEqual(root.calls, 3)
+
+    def test_array_content_hash(self):
+        x = Variable(1)
+        zeros = Zeros(x)
+        root = Counted(zeros)
+        root.evaluate()
+        x.value = 2
+        root.evaluate()
+        self.assertEqual(root.calls, 1)
+
+    def test_variable_set_to_same_value(self):
+        x = Variable(1)
+        root = Counted(x)
+        root.evaluate()
+        x.value = 1
+        root.evaluate()
+        self.assertEqual(root.calls, 1)
+
+    def test_disabled_by_default(self):
+        x = Variable(5)
+        clamp = Clamp(x, maximum=3)
+        clamp.early_cutoff = None
+        root = Counted(clamp)
+        root.evaluate()
+        x.value = 6
+        root.evaluate()
+        self.assertEqual(root.calls, 2)
+
+
+class KeyCounted(Add):
+    computed = 0
+    def compute_key(self):
+        KeyCounted.computed += 1
+        return super().compute_key()
+
+
+class StructuralKeys(unittest.TestCase):
+    def test_shared_subgraphs_are_keyed_once(self):
+        op = Constant(1)
+        for i in range(100):
+            op = KeyCounted(op, op) # 2**100 paths
+        KeyCounted.computed = 0
+        self.assertIsInstance(op.key(), bytes)
+        self.assertEqual(KeyCounted.computed, 100)
+        op.key()
+        self.assertEqual(KeyCounted.computed, 100)
+
+    def test_deep_graph(self):
+        op = Constant(1)
+        for i in range(5000):
+            op = Add(op, Constant(1))
+        self.assertEqual(len(op.key()), 16)
+
+    def test_variable_invalidates_downstream_keys(self):
+        x = Variable(1)
+        independent = KeyCounted(Constant(2), Constant(3))
+        root = KeyCounted(x, independent)
+        key = root.key()
+        KeyCounted.computed = 0
+        x.value = 2
+        self.assertNotEqual(root.key(), key)
+        self.assertEqual(KeyCounted.computed, 1) # independent is not recomputed
+        x.value = 1
+        self.assertEqual(root.key(), key)
+
+    def test_set_inputs_invalidates_key(self):
+        one, two = Constant(1), Constant(2)
+        add = Add(one, two)
+        key = add.key()
+        add.set_inputs(two, one)
+        self.assertNotEqual(add.key(), key)
+        add.set_inputs(one, two)
+        self.assertEqual(add.key(), key)
+
+    def test_function_operators_are_distinct(self):
+        one = Constant(1)
+        First = operator(lambda a: a)
+        def second(a): return a
+        Second = operator(second)
+        self.assertNotEqual(First(one).key(), Second(one).key())
+
+
+class Token:
+    """counts the live instances"""
+    live = 0
+    peak = 0
+    def __init__(self):
+        Token.live += 1
+        Token.peak = max(Token.peak, Token.live)
+
+    def __del__(self):
+        Token.live -= 1
+
+
+class MakeToken(Operator):
+    def __call__(self, *args):
+        return Token()
+
+
+class BatchEvaluation(unittest.TestCase):
+    def test_shared_nodes_are_evaluated_once(self):
+        shared = Counted(Constant(1))
+        full = Counted(shared, Constant(10))
+        thumb = Counted(shared, Constant(20))
+        preview = Counted(full, thumb)
+        self.assertEqual(evaluate_many([preview, thumb, full]), [32, 21, 11])
+        self.assertEqual(shared.calls, 1)
+        self.assertEqual(evaluate_many([full, thumb], incremental=False), [11, 21])
+        self.assertEqual(shared.calls, 2)
+
+    def test_plan_is_reused(self):
+        a = Counted(Constant(1))
+        b = Counted(Constant(2))
+        evaluate_many([a, b])
+        plan = a._plans["batch"]
+        evaluate_many([a, b])
+        self.assertIs(a._plans["batch"], plan)
+        evaluate_many([a])
+        self.assertIsNot(a._plans["batch"], plan)
+
+    def test_intermediates_are_released(self):
+        op = MakeToken()
+        for i in range(10):
+            op = MakeToken(op)
+        other = MakeToken(op)
+        Token.live = Token.peak = 0
+        results = evaluate_many([op, other], incremental=False)
+        self.assertEqual(len(results), 2)
+        self.assertLessEqual(Token.peak, 3)
+        self.assertEqual(Token.live, 2) # the results
+
+
+class Fails(Operator):
+    def __call__(self, x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+
+class FrameRange(unittest.TestCase):
+    def setUp(self):
+        self.frame = Variable(0)
+        self.static_branch = Counted(Constant(10))
+        self.frame_branch = Counted(self.frame)
+        self.root = Counted(self.frame_branch, self.static_branch)
+
+    def test_yields_frames_lazily(self):
+        frames = self.root.evaluate_range(self.frame, range(1, 5))
+        self.assertEqual(next(frames), (1, 11))
+        self.assertEqual(self.root.calls, 1)
+        self.assertEqual(list(frames), [(2, 12), (3, 13), (4, 14)])
+        self.assertEqual(self.static_branch.calls, 1) # kept across frames
+        plan = self.root.plan()
+        list(self.root.evaluate_range(self.frame, range(5, 7)))
+        self.assertIs(self.root.plan(), plan)
+
+    def test_readahead(self):
+        results = list(self.root.evaluate_range(self.frame, range(100), readahead=4))
+        self.assertEqual(results, [(F, F+10) for F in range(100)])
+        self.assertEqual(self.static_branch.calls, 1)
+
+    def test_readahead_is_bounded(self):
+        frames = self.root.evaluate_range(self.frame, range(100), readahead=4)
+        next(frames)
+        import time; time.sleep(0.2)
+        self.assertLessEqual(self.frame_branch.calls, 1+4+1) # yielded, queued, and one waiting
+        frames.close()
+        self.assertLess(self.frame_branch.calls, 100)
+
+    def test_readahead_error(self):
+        root = Fails(self.frame)
+        frames = root.evaluate_range(self.frame, range(10), readahead=2)
+        self.assertEqual([next(frames) for i in range(3)], [(0, 0), (1, 1), (2, 2)])
+        with self.assertRaises(ValueError):
+            next(frames)
+
+
+class DependencyOrder(unittest.TestCase):
+    def test_dependencies_come_first(self):
+        one = Constant(1)
+        plus = Add(one, Constant(2))
+        root = Add(plus, one)
+        order, G = dependency_order(root)
+        self.assertIs(order[-1], root)
+        for N in order:
+            for S in G[N]:
+                self.assertLess(order.index(S), order.index(N))
+
+    def test_cycle_names_path(self):
+        a = Add()
+        b = Add(a, Constant(1))
+        a.set_inputs(b, Constant(1))
+        with self.assertRaises(CycleError) as ctx:
+            a.evaluate()
+        self.assertEqual(ctx.exception.path, [a, b, a])
+        self.assertIn(f"{a} -> {b} -> {a}", str(ctx.exception))
+
+
+class CompactGraph(unittest.TestCase):
+    def setUp(self):
+        self.one = Constant(1)
+        self.plus = Add(self.one, self.one)
+        self.root = Add(self.plus, self.one)
+        self.graph = CSRGraph.build(self.root)
+
+    def test_ids_in_dependency_order(self):
+        order, G = dependency_order(self.root)
+        self.assertEqual(self.graph.nodes, order)
+        self.assertEqual(dict(self.graph.to_graph()), dict(G))
+        self.assertEqual(self.graph.rows(), [[], [0, 0], [1, 0]])
+
+    def test_consumers_once_per_node(self):
+        self.assertEqual(self.graph.transpose().rows(), [[1, 2], [2], []])
+        self.assertEqual(self.graph.downstream([1]).tolist(), [False, True, True])
+
+    def test_cycle(self):
+        a = Add()
+        a.set_inputs(Add(a, Constant(1)), Constant(1))
+        with self.assertRaises(CycleError):
+            CSRGraph.build(a)
+
+    def test_operators_have_no_dict(self):
+        for op in [self.one, Variable(0), Cache(self.one), Switch(Constant(0), self.one)]:
+            self.assertFalse(hasattr(op, "__dict__"))
+
+    def test_consumers_are_weak(self):
+        import gc
+        for _ in range(20):
+            Add(self.one, self.one)
+        gc.collect()
+        self.assertEqual(self.one.consumers(), [self.plus, self.root])
+
+
+class CommonSubexpressions(unittest.TestCase):
+    def setUp(self):
+        self.left = Counted(Constant(5))
+        self.right = Counted(Constant(5))
+        self.root = Add(self.left, self.right)
+
+    def test_duplicates_are_evaluated_once(self):
+        self.assertEqual(self.root.evaluate(merge=True), 10)
+        self.assertEqual(len(self.root.plan(merge=True).merged), 2)
+        self.assertEqual(self.left.calls + self.right.calls, 1)
+
+    def test_operators_are_untouched(self):
+        self.root.evaluate(merge=True)
+        self.assertEqual(self.root.inputs(), [self.left, self.right])
+        self.assertFalse(self.right.is_dirty())
+        self.assertEqual(self.right.evaluate(), 5)
+        self.assertEqual(self.left.calls + self.right.calls, 1)
+
+    def test_changed_parameter_splits_duplicates(self):
+        self.root.evaluate(merge=True)
+        self.right.inputs()[0].value = 6
+        self.assertEqual(self.root.evaluate(merge=True), 11)
+        self.assertEqual(len(self.root.plan(merge=True).merged), 0)
+
+    def test_variables_are_merged_by_identity(self):
+        root = Add(Counted(Variable(1)), Counted(Variable(1)))
+        self.assertEqual(len(root.plan(merge=True).merged), 0)
+
+        frame = Variable(1)
+        left, right = Counted(frame), Counted(frame)
+        root = Add(left, right)
+        self.assertEqual(len(root.plan(merge=True).merged), 1)
+        for value in range(3):
+            frame.value = value
+            self.assertEqual(root.evaluate(merge=True), 2*value)
+        self.assertEqual(left.calls + right.calls, 3)
+
+
+class Big(Operator):
+    def __call__(self):
+        return np.zeros(1000)
+
+
+class Shrink(Operator):
+    def __init__(self, img):
+        super().__init__(img)
+
+    def __call__(self, img):
+        return img[:1].copy()
+
+
+class MemoryOrder(unittest.TestCase):
+    def setUp(self):
+        # depth first evaluates the first Big while the second one is shrunk
+        self.first = Big()
+        self.root = Add(self.first, Shrink(Big()))
+
+    def test_dependency_order_holds_both(self):
+        plan = self.root.plan()
+        self.assertLess(plan.index[self.first], plan.index[self.root.inputs()[1]])
+
+    def test_peak_is_reduced(self):
+        self.assertEqual(self.root.evaluate(incremental=False, low_memory=True).shape, (1000,))
+        plan = self.root.plan(low_memory=True)
+        self.assertEqual(plan.predicted_peak, 8000+8+8000)
+        self.assertEqual(self.root.evaluate(incremental=False, low_memory=True).shape, (1000,))
+        self.assertEqual(plan.peak, plan.predicted_peak)
+        self.assertEqual(plan.order[-2], self.first)
+
+    def test_estimates(self):
+        class Estimated(Big):
+            def estimate_nbytes(self, input_nbytes):
+                return 8000
+        first = Estimated()
+        root = Add(first, Shrink(Estimated()))
+        self.assertEqual(root.plan(low_memory=True).order[-2], first)
+
+    def test_incremental(self):
+        with self.assertRaises(ValueError):
+            self.root.evaluate(low_memory=True)
+
+
+class Mix(Operator):
+    """a lazy mix of two numbers"""
+    lazy = (0, 1)
+    def __init__(self, A, B, mix):
+        super().__init__(A, B, mix)
+
+    def __call__(self, A, B, mix):
+        if mix == 0:
+            return A()
+        return A()*(1-mix) + B()*mix
+
+
+class KnownMix(Mix):
+    """tells the inputs it uses"""
+    def needed(self, mix):
+        return (0,) if mix == 0 else (0, 1)
+
+
+class LazyInputs(unittest.TestCase):
+    def setUp(self):
+        self.index = Variable(0)
+        self.a = Counted(Constant(1))
+        self.b = Counted(Constant(2))
+        self.switch = Switch(self.index, self.a, self.b)
+
+    def test_unselected_input_is_not_evaluated(self):
+        self.assertEqual(self.switch.evaluate(), 1)
+        self.assertEqual(self.b.calls, 0)
+        self.index.value = 1
+        self.assertEqual(self.switch.evaluate(), 2)
+        self.assertEqual(self.a.calls, 1)
+        self.assertEqual(self.b.calls, 1)
+
+    def test_lazy_input_change_recomputes(self):
+        self.switch.evaluate()
+        self.a.set_inputs(Constant(5))
+        self.assertEqual(self.switch.evaluate(), 5)
+
+    def test_strict_inputs_in_parallel(self):
+        mix = Mix(self.a, self.b, Counted(Constant(0)))
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.assertEqual(mix.evaluate(executor=pool), 1)
+            self.assertEqual(KnownMix(self.a, self.b, Constant(0)).evaluate(executor=pool), 1)
+        self.assertEqual(self.b.calls, 0)
+
+        # the inputs it needs run concurrently
+        barrier = threading.Barrier(2, timeout=5)
+        mix = KnownMix(Meet(self.a, barrier), Meet(self.b, barrier), Constant(0.5))
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.assertEqual(mix.evaluate(executor=pool), 1.5)
+
+    def test_shared_upstream_is_evaluated_once(self):
+        upstream = Counted(Constant(1))
+        mix = Mix(Counted(upstream), Counted(upstream), Constant(0.5))
+        root = Counted(mix, upstream)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            self.assertEqual(root.evaluate(executor=pool), 2)
+        self.assertEqual(upstream.calls, 1)
+
+        self.assertEqual(root.evaluate(incremental=False), 2)
+        self.assertEqual(upstream.calls, 2)
+        self.assertEqual(evaluate_many([root, mix], incremental=False), [2, 1])
+        self.assertEqual(upstream.calls, 3)
+
+    def test_non_incremental_and_contexts(self):
+        self.assertEqual(self.switch.evaluate(incremental=False), 1)
+        self.assertEqual(self.switch.evaluate(overrides={self.index: 1}), 2)
+        self.assertEqual(self.a.calls + self.b.calls, 2)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file
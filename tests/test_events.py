@@ -0,0 +1,84 @@
+import unittest
+import nodeflow as nf
+from nodeflow import events
+
+
+class Fails(nf.Operator):
+    def __init__(self, value:nf.Operator):
+        super().__init__(value)
+
+    def __call__(self, value):
+        raise ValueError(value)
+
+
+class Events(unittest.TestCase):
+    def setUp(self):
+        self.received = []
+        self.unsubscribe = events.subscribe(self.received.append)
+
+    def tearDown(self):
+        self.unsubscribe()
+
+    def types(self):
+        return [type(event) for event in self.received]
+
+    def test_node_events(self):
+        one = nf.Constant(1)
+        root = nf.Plus(one, nf.Constant(2))
+        self.assertEqual(root.evaluate(), 3)
+        self.assertEqual(self.types()[0], events.PlanBuilt)
+        self.assertEqual(self.types()[1:], [events.NodeStarted, events.NodeFinished]*3)
+        finished = self.received[-1]
+        self.assertIs(finished.node, root)
+        self.assertEqual(finished.value, 3)
+
+    def test_error(self):
+        root = Fails(nf.Constant(1))
+        with self.assertRaises(ValueError):
+            root.evaluate()
+        self.assertEqual(self.types()[-1], events.NodeError)
+        self.assertIs(self.received[-1].node, root)
+
+    def test_cache(self):
+        x = nf.Variable(1)
+        cached = nf.Cache(nf.Plus(x, nf.Constant(1)), store=nf.ResultCache(budget=200))
+        cached.evaluate()
+        x.value = 2
+        cached.evaluate()
+        x.value = 1
+        cached.evaluate()
+        lookups = [type(event) for event in self.received if isinstance(event, (events.CacheHit, events.CacheMiss))]
+        self.assertEqual(lookups, [events.CacheMiss, events.CacheMiss, events.CacheHit])
+
+        # clean: no lookup, and the plan is kept
+        del self.received[:]
+        cached.evaluate()
+        self.assertEqual(self.received, [])
+
+    def test_eviction(self):
+        store = nf.ResultCache(budget=100)
+        store.put("a", b"x"*60)
+        store.put("b", b"x"*60)
+        self.assertEqual(self.types(), [events.Eviction])
+        self.assertEqual(self.received[0].key, "a")
+
+
+class Subscription(unittest.TestCase):
+    def test_filtered_by_type(self):
+        received = []
+        unsubscribe = events.subscribe(received.append, events.NodeFinished)
+        nf.Constant(1).evaluate()
+        unsubscribe()
+        self.assertEqual([type(event) for event in received], [events.NodeFinished])
+
+    def test_unsubscribe(self):
+        received = []
+        unsubscribe = events.subscribe(received.append)
+        unsubscribe()
+        self.assertFalse(events.listening)
+        nf.Constant(1).evaluate()
+        self.assertEqual(received, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import nodeflow as nf
+import unittest
+import threading
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from multiprocessing import shared_memory
+from nodeflow.executors import ProcessExecutor
+from nodeflow.image import Blend
+from helpers import Meet
+
+
+class Fail(nf.Operator):
+    def __call__(self, x):
+        raise RuntimeError("failed")
+
+
+class Pid(nf.Operator):
+    """the process evaluating the operator"""
+    process_safe = True
+    def __call__(self, x):
+        return os.getpid()
+
+
+class Double(nf.Operator):
+    process_safe = True
+    def __call__(self, img):
+        return img*2
+
+
+class Identity(nf.Operator):
+    process_safe = True
+    def __call__(self, img):
+        return img
+
+
+@nf.operator
+def Halve(img):
+    return img/2
+Halve.process_safe = True
+
+
+def wide_graph(x:nf.Operator, width:int, depth:int)->nf.Operator:
+    branches = []
+    for b in range(width):
+        op = x
+        for d in range(depth):
+            op = nf.Multiply(nf.Plus(op, nf.Constant(b)), nf.Constant(d+1))
+        branches.append(op)
+    root = branches[0]
+    for op in branches[1:]:
+        root = nf.Minus(root, op)
+    return root
+
+
+class ThreadPoolEvaluation(unittest.TestCase):
+    def test_matches_sequential(self):
+        x = nf.Variable(1)
+        root = wide_graph(x, width=8, depth=5)
+        expected = root.evaluate(incremental=False)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual(root.evaluate(executor=executor), expected)
+            x.value = 2
+            expected = root.evaluate(incremental=False)
+            self.assertEqual(root.evaluate(executor=executor), expected)
+
+    def test_branches_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        x = nf.Constant(1)
+        root = nf.Plus(Meet(x, barrier), Meet(x, barrier))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(root.evaluate(executor=executor), 2)
+
+    def test_blend_inputs_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        x = nf.Constant(np.ones(3))
+        root = Blend(Meet(x, barrier), Meet(x, barrier), nf.Constant(0.5))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            np.testing.assert_equal(root.evaluate(executor=executor), np.ones(3))
+        x.invalidate()
+        np.testing.assert_equal(asyncio.run(root.evaluate_async()), np.ones(3))
+
+    def test_error_keeps_nodes_dirty(self):
+        x = nf.Variable(1)
+        fail = Fail(x)
+        root = nf.Plus(fail, nf.Constant(1))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with self.assertRaises(RuntimeError):
+                root.evaluate(executor=executor)
+        self.assertTrue(fail.is_dirty())
+        self.assertTrue(root.is_dirty())
+
+
+class ProcessPoolEvaluation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ProcessExecutor(max_workers=2, min_shared_bytes=1024)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def test_process_safe_operators_are_shipped(self):
+        x = nf.Constant(1)
+        root = nf.Plus(Pid(x), nf.Constant(0))
+        self.assertNotEqual(root.evaluate(executor=self.executor), os.getpid())
+
+    def test_profiled_in_the_worker(self):
+        pid = Pid(nf.Constant(1))
+        with nf.Profile() as profile:
+            worker = pid.evaluate(executor=self.executor)
+        record, = profile.records[1:] # after the constant
+        self.assertEqual(record.name, repr(pid))
+        self.assertEqual(record.pid, worker)
+        self.assertNotEqual(record.pid, os.getpid())
+        self.assertEqual(record.thread, "MainThread")
+        self.assertIsNotNone(record.cpu)
+
+    def test_other_operators_run_locally(self):
+        self.assertFalse(self.executor.ships(nf.Plus(nf.Constant(1), nf.Constant(2))))
+
+    def test_shared_memory_arrays(self):
+        img = np.random.rand(256, 256).astype(np.float32)
+        blocks = []
+        create = shared_memory.SharedMemory
+        def tracked(*args, **kwargs):
+            shm = create(*args, **kwargs)
+            blocks.append(shm.name)
+            return shm
+
+        shared_memory.SharedMemory = tracked
+        try:
+            root = Halve(Identity(Double(nf.Constant(img))))
+            result = root.evaluate(executor=self.executor)
+        finally:
+            shared_memory.SharedMemory = create
+        np.testing.assert_array_equal(result, img)
+        self.assertGreater(len(blocks), 0)
+        for name in blocks: # released
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+    def test_matches_sequential(self):
+        img = nf.Variable(3)
+        root = wide_graph(img, width=4, depth=3)
+        expected = root.evaluate(incremental=False)
+        self.assertEqual(root.evaluate(executor=self.executor), expected)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
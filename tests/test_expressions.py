@@ -0,0 +1,96 @@
+import unittest
+import numpy as np
+import nodeflow as nf
+from nodeflow import Constant, Variable, Expression
+from nodeflow import fusion, expressions
+
+
+class Expressions(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.a = rng.random((100, 30, 3), dtype=np.float32)
+        self.b = rng.random((100, 30, 3), dtype=np.float32)
+        self.A, self.B = Constant(self.a), Constant(self.b)
+        self.mix = Variable(0.25)
+        self.block_nbytes = fusion.BLOCK_NBYTES
+        fusion.BLOCK_NBYTES = 30*3*4*7 # 7 rows per block
+
+    def tearDown(self):
+        fusion.BLOCK_NBYTES = self.block_nbytes
+
+    def test_same_result_as_numpy(self):
+        blend = Expression("A*mix + B*(1-mix) + 0.1", A=self.A, B=self.B, mix=self.mix)
+        result = blend.evaluate()
+        expected = self.a*0.25 + self.b*(1-0.25) + 0.1
+        self.assertEqual(result.dtype, expected.dtype)
+        np.testing.assert_allclose(result, expected, rtol=1e-6)
+
+        self.mix.value = 0.75
+        np.testing.assert_allclose(blend.evaluate(), self.a*0.75 + self.b*0.25 + 0.1, rtol=1e-6)
+
+    def test_functions_and_broadcasting(self):
+        gain = Constant(np.array([1, 2, 3], dtype=np.float32))
+        expression = Expression("clip(sqrt(A)*gain - 1, 0, 1) ** 2", A=self.A, gain=gain)
+        expected = np.clip(np.sqrt(self.a)*gain.value - 1, 0, 1) ** 2
+        np.testing.assert_allclose(expression.evaluate(), expected, rtol=1e-6)
+
+    def test_scalars(self):
+        self.assertEqual(Expression("-x/2 + maximum(x, 3)", x=Constant(4)).evaluate(), 2.0)
+        np.testing.assert_array_equal(Expression("A", A=self.A).evaluate(), self.a)
+
+    def test_compiled_once_per_dtypes(self):
+        text = "A*2 + B"
+        first = expressions.compiled(text, expressions.parse(text, ["A", "B"]), ["A", "B"], [self.a, self.b])
+        again = Expression(text, A=self.A, B=self.B)
+        again.evaluate()
+        self.assertIs(expressions.compiled(again.text, again.tree, again.names, [self.a, self.b]), first)
+        double = expressions.compiled(text, again.tree, again.names, [self.a.astype(np.float64), self.b])
+        self.assertIsNot(double, first)
+        self.assertEqual(double.dtype, np.float64)
+
+    def test_no_full_frame_temporaries(self):
+        text = "A*mix + B*(1-mix) + 0.1"
+        kernel = expressions.compiled(text, expressions.parse(text, ["A", "B", "mix"]), ["A", "B", "mix"], [self.a, self.b, 0.25])
+        self.assertEqual(kernel.source.count("np.empty"), 2) # block sized buffers
+        self.assertIn("s0 = ", kernel.source) # 1-mix once per call
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Expression("A +", A=self.A)
+        with self.assertRaises(ValueError):
+            Expression("A + C", A=self.A)
+        with self.assertRaises(ValueError):
+            Expression("A.sum()", A=self.A)
+        with self.assertRaises(ValueError):
+            Expression("open('file')", A=self.A)
+        with self.assertRaises(ValueError):
+            Expression("sqrt + A", A=self.A)
+        with self.assertRaises(ValueError):
+            Expression("sqrt(A, A)", A=self.A)
+        with self.assertRaises(ValueError):
+            Expression("clip(A, 0)", A=self.A)
+
+    def test_shape_of_the_used_inputs(self):
+        result = Expression("x*2", x=Constant(np.ones(3)), B=Constant(np.ones((2, 3)))).evaluate()
+        np.testing.assert_array_equal(result, [2, 2, 2])
+
+    def test_vectorized_per_element(self):
+        v = Variable(1)
+        expression = Expression("A*v", A=Constant(np.ones((2, 2))), v=v)
+        with self.assertWarns(nf.FallbackWarning):
+            result = expression.evaluate_vectorized({v: [10, 100]})
+        self.assertEqual(result.shape, (2, 2, 2))
+        np.testing.assert_array_equal(result[1], np.full((2, 2), 100))
+
+    def test_keys_and_fusion(self):
+        first = Expression("A + 1", A=self.A)
+        self.assertEqual(first.key(), Expression("A + 1", A=self.A).key())
+        self.assertNotEqual(first.key(), Expression("A + 2", A=self.A).key())
+
+        root = nf.Multiply(first, Constant(2))
+        self.assertIn(root, root.plan(fuse=True).fused)
+        np.testing.assert_allclose(root.evaluate(incremental=False, fuse=True), (self.a + 1)*2)
+
+
+if __name__ == '__main__':
+    unittest.main()
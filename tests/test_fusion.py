@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+import nodeflow as nf
+from nodeflow import Operator, Constant, Variable
+from nodeflow.image import Blend
+from nodeflow import fusion
+from helpers import CountedValue
+
+
+class Sum(Operator):
+    """not element wise"""
+    def __init__(self, img):
+        super().__init__(img)
+
+    def __call__(self, img):
+        return img.sum()
+
+
+class Fusion(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.A = Constant(rng.random((100, 30, 3), dtype=np.float32))
+        self.B = Constant(rng.random((100, 30, 3), dtype=np.float32))
+        self.mix = Variable(0.25)
+        self.blend = Blend(self.A, self.B, self.mix)
+        self.root = nf.Minus(nf.Multiply(self.blend, Constant(np.float32(2))), nf.Constant(np.array([0.1, 0.2, 0.3], dtype=np.float32)))
+        self.block_nbytes = fusion.BLOCK_NBYTES
+        fusion.BLOCK_NBYTES = 30*3*4*7 # 7 rows per block
+
+    def tearDown(self):
+        fusion.BLOCK_NBYTES = self.block_nbytes
+
+    def test_chain_is_one_kernel(self):
+        plan = self.root.plan(fuse=True)
+        self.assertEqual(plan.fused[self.root].members, [self.blend, self.root.inputs()[0], self.root])
+        self.assertNotIn(self.blend, plan.index)
+
+    def test_same_result(self):
+        expected = self.root.evaluate(incremental=False)
+        result = self.root.evaluate(incremental=False, fuse=True)
+        self.assertEqual(result.dtype, expected.dtype)
+        np.testing.assert_allclose(result, expected, rtol=1e-6)
+
+    def test_lazy_inputs(self):
+        A, B = CountedValue(self.A.value), CountedValue(self.B.value)
+        root = nf.Plus(Blend(A, B, self.mix), Constant(1))
+        self.mix.value = 0
+        np.testing.assert_allclose(root.evaluate(incremental=False, fuse=True), A.value + 1)
+        self.assertEqual((A.calls, B.calls), (1, 0))
+        self.mix.value = 0.5
+        np.testing.assert_allclose(root.evaluate(incremental=False, fuse=True), (A.value + B.value)/2 + 1, rtol=1e-6)
+        self.assertEqual((A.calls, B.calls), (2, 1))
+
+        # extrapolated outside of 0 and 1
+        self.mix.value = 1.5
+        np.testing.assert_allclose(root.evaluate(incremental=False, fuse=True), 1.5*B.value - 0.5*A.value + 1, rtol=1e-5)
+        self.mix.value = -0.5
+        np.testing.assert_allclose(root.evaluate(incremental=False), 1.5*A.value - 0.5*B.value + 1, rtol=1e-5)
+
+    def test_lazy_inputs_reuse_the_results_of_the_run(self):
+        A, B = CountedValue(self.A.value), CountedValue(self.B.value)
+        root = nf.Plus(Blend(A, B, self.mix), A)
+        self.assertIn(root, root.plan(fuse=True).fused)
+        np.testing.assert_allclose(root.evaluate(incremental=False, fuse=True), A.value*1.75 + B.value*0.25, rtol=1e-6)
+        self.assertEqual((A.calls, B.calls), (1, 1))
+
+    def test_shared_results_are_not_fused(self):
+        shared = nf.Multiply(self.A, Constant(2))
+        root = nf.Plus(nf.Plus(shared, Constant(1)), Sum(shared))
+        plan = root.plan(fuse=True)
+        self.assertIn(shared, plan.index)
+        self.assertEqual(plan.fused[root].members, [root.inputs()[0], root])
+        np.testing.assert_allclose(root.evaluate(incremental=False, fuse=True), root.evaluate(incremental=False))
+
+    def test_scalars_and_unblockable_inputs(self):
+        scalar = nf.Multiply(nf.Plus(Constant(1), Constant(2)), Constant(3))
+        self.assertEqual(scalar.evaluate(incremental=False, fuse=True), 9)
+
+        # the larger frame comes second: evaluated whole
+        row = Constant(np.ones((30, 3), dtype=np.float32))
+        root = nf.Plus(nf.Multiply(row, Constant(2)), self.A)
+        np.testing.assert_allclose(root.evaluate(incremental=False, fuse=True), self.A.value + 2)
+
+    def test_incremental(self):
+        with self.assertRaises(ValueError):
+            self.root.evaluate(fuse=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
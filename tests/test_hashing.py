@@ -0,0 +1,105 @@
+import nodeflow as nf
+import unittest
+import numpy as np
+from nodeflow.hashing import content_hash, sampled_hash
+
+
+class Invert(nf.Operator):
+    def __init__(self, img:nf.Operator):
+        super().__init__(img)
+        self.calls = 0
+
+    def __call__(self, img):
+        self.calls += 1
+        return 1.0-img
+
+
+class ContentHash(unittest.TestCase):
+    def test_equal_arrays(self):
+        a = np.arange(12, dtype=np.float32)
+        b = np.arange(12, dtype=np.float32)
+        self.assertEqual(content_hash(a), content_hash(b))
+
+    def test_dtype_and_shape_are_mixed_in(self):
+        a = np.zeros(12, dtype=np.float32)
+        self.assertNotEqual(content_hash(a), content_hash(a.astype(np.int32)))
+        self.assertNotEqual(content_hash(a), content_hash(a.reshape(3, 4)))
+
+    def test_non_contiguous(self):
+        a = np.arange(24).reshape(4, 6)
+        self.assertEqual(content_hash(a[:, ::2]), content_hash(a[:, ::2].copy()))
+
+    def test_cached_per_object(self):
+        a = np.zeros(12)
+        digest = content_hash(a)
+        a[0] = 1 # arrays are assumed not to change in place
+        self.assertEqual(content_hash(a), digest)
+        self.assertNotEqual(content_hash(a, cache=False), digest)
+
+    def test_sampled_hash(self):
+        a = np.zeros(1<<20, dtype=np.uint8)
+        digest = sampled_hash(a, sample=4096, cache=False)
+        self.assertNotEqual(digest, content_hash(a))
+        a[-1] = 1
+        self.assertNotEqual(sampled_hash(a, sample=4096, cache=False), digest)
+
+    def test_unpicklable_values_hash_by_identity(self):
+        f = lambda: None
+        self.assertEqual(content_hash(f), content_hash(f))
+        self.assertNotEqual(content_hash(f), content_hash(lambda: None))
+
+    def test_identities_are_not_reused(self):
+        digests = set()
+        for _ in range(100): # the ids of collected lambdas are reused
+            digests.add(content_hash(lambda: None))
+        self.assertEqual(len(digests), 100)
+
+        class Slotted:
+            __slots__ = ()
+            def __reduce__(self):
+                raise TypeError("not picklable")
+        with self.assertRaises(TypeError):
+            content_hash(Slotted())
+
+
+class ContentKeys(unittest.TestCase):
+    def test_equal_constants_share_keys(self):
+        a = nf.Constant(np.ones((4, 4)))
+        b = nf.Constant(np.ones((4, 4)))
+        self.assertEqual(a.key(), b.key())
+        self.assertNotEqual(a.key(), nf.Constant(np.zeros((4, 4))).key())
+
+    def test_constant_value_change(self):
+        a = nf.Constant(1)
+        key = a.key()
+        a.value = 2
+        self.assertNotEqual(a.key(), key)
+
+    def test_equal_inputs_hit_the_cache(self):
+        store = nf.ResultCache()
+        first = Invert(nf.Constant(np.ones((4, 4))))
+        second = Invert(nf.Constant(np.ones((4, 4))))
+        nf.Cache(first, store=store).evaluate()
+        result = nf.Cache(second, store=store).evaluate()
+        self.assertEqual(second.calls, 0)
+        self.assertTrue(np.all(result == 0))
+        self.assertEqual(store.stats()["hits"], 1)
+
+    def test_function_operators_are_keyed_by_captured_values(self):
+        def scale(k):
+            @nf.operator
+            def Scale(x):
+                return x*k
+            return Scale
+        c = nf.Constant(3)
+        self.assertEqual(scale(2)(c).key(), scale(2)(c).key())
+        self.assertNotEqual(scale(2)(c).key(), scale(10)(c).key())
+        self.assertEqual(nf.evaluate_many([scale(2)(c), scale(10)(c)], merge=True), [6, 30])
+
+        store = nf.ResultCache()
+        self.assertEqual(nf.Cache(scale(2)(c), store=store).evaluate(), 6)
+        self.assertEqual(nf.Cache(scale(10)(c), store=store).evaluate(), 30)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,90 @@
+import unittest
+import json
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import nodeflow as nf
+
+
+class Ones(nf.Operator):
+    def __call__(self):
+        return np.ones(100)
+
+
+class Scale(nf.Operator):
+    def __init__(self, img:nf.Operator):
+        super().__init__(img)
+
+    def __call__(self, img):
+        return img*2
+
+
+class AsyncScale(Scale):
+    async def __call__(self, img):
+        return img*2
+
+
+class Profiling(unittest.TestCase):
+    def setUp(self):
+        self.ones = Ones()
+        self.left = Scale(self.ones)
+        self.right = Scale(self.ones)
+        self.root = nf.Plus(self.left, self.right)
+
+    def test_records_every_call(self):
+        with nf.Profile() as profile:
+            self.root.evaluate()
+        self.assertEqual([r.name for r in profile.records][-1], repr(self.root))
+        self.assertEqual(len(profile.records), 4)
+        record = profile.records[0]
+        self.assertEqual(record.operator, "Ones")
+        self.assertEqual(record.output, "ndarray")
+        self.assertEqual(record.nbytes, 800)
+        self.assertEqual(record.pid, os.getpid())
+        self.assertGreaterEqual(record.wall, 0.0)
+
+    def test_disabled(self):
+        with nf.Profile() as profile:
+            pass
+        self.root.evaluate()
+        self.assertEqual(profile.records, [])
+        self.assertFalse(nf.events.listening)
+
+    def test_chrome_trace(self):
+        with nf.Profile() as profile:
+            self.root.evaluate(incremental=False)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "trace.json")
+            profile.save(path)
+            with open(path) as file:
+                trace = json.load(file)
+        calls = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(calls[0]["cat"], "Ones")
+        self.assertEqual(calls[0]["ts"], 0.0)
+        self.assertEqual(calls[0]["args"]["nbytes"], 800)
+
+    def test_summary(self):
+        with nf.Profile() as profile:
+            self.root.evaluate()
+        self.assertEqual(profile.totals()["Scale"]["calls"], 2)
+        self.assertIn("Scale", profile.summary())
+        self.assertEqual(len(profile.totals(by="name")), 4)
+
+    def test_executor_threads(self):
+        with nf.Profile() as profile, ThreadPoolExecutor(max_workers=2) as pool:
+            self.root.evaluate(executor=pool)
+        self.assertEqual(len(profile.records), 4)
+        self.assertTrue(all(r.thread != "MainThread" for r in profile.records))
+
+    def test_async(self):
+        root = nf.Plus(AsyncScale(self.ones), self.right)
+        with nf.Profile() as profile:
+            asyncio.run(root.evaluate_async())
+        self.assertEqual(sorted(r.operator for r in profile.records), ["AsyncScale", "Ones", "Plus", "Scale"])
+
+
+if __name__ == '__main__':
+    unittest.main()
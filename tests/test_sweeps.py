@@ -0,0 +1,87 @@
+import unittest
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+import nodeflow as nf
+from nodeflow import Operator, Constant, Variable, Switch, Sweep
+from helpers import Counted
+
+
+class Fail(Operator):
+    def __call__(self, value):
+        raise ValueError(value)
+
+
+class Sweeps(unittest.TestCase):
+    def setUp(self):
+        self.a = Variable(0)
+        self.b = Variable(0)
+        self.c = Variable(0)
+        self.static = Counted(Constant(100))
+        self.only_a = Counted(self.a, self.static)
+        self.a_and_b = Counted(self.only_a, self.b)
+        self.only_c = Counted(self.c)
+        self.root = Counted(self.a_and_b, self.only_c)
+        self.values = {self.a: [1, 2], self.b: [10, 20, 30], self.c: [1000, 2000]}
+
+    def expected(self):
+        return {(a, b, c): a+100+b+c for a, b, c in itertools.product(*self.values.values())}
+
+    def collect(self, results):
+        return {(p[self.a], p[self.b], p[self.c]): result for p, result in results}
+
+    def test_combinations(self):
+        results = list(nf.sweep(self.root, self.values))
+        self.assertEqual(len(results), len(Sweep(self.root, self.values)))
+        self.assertEqual([tuple(p.values()) for p, _ in results], list(itertools.product(*self.values.values())))
+        self.assertEqual(self.collect(results), self.expected())
+        self.assertEqual(self.a.value, 0)
+
+    def test_partial_results_are_reused(self):
+        list(nf.sweep(self.root, self.values))
+        self.assertEqual(self.static.calls, 1)
+        self.assertEqual(self.only_a.calls, 2)
+        self.assertEqual(self.a_and_b.calls, 6)
+        self.assertEqual(self.only_c.calls, 2)
+        self.assertEqual(self.root.calls, 12)
+
+    def test_results_are_dropped_after_their_last_combination(self):
+        sweep = Sweep(self.root, self.values)
+        sizes = [len(sweep.memo) for _ in sweep.run()]
+        self.assertEqual(max(sizes), 4) # of 10 results: only_a, both only_c and one a_and_b
+        self.assertEqual(sweep.memo, {})
+        self.assertEqual(self.only_c.calls, 2)
+
+        sweep = Sweep(self.root, self.values)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            self.assertEqual(self.collect(sweep.run(executor=pool, readahead=5)), self.expected())
+        self.assertEqual(sweep.memo, {})
+
+    def test_executor(self):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = self.collect(nf.sweep(self.root, self.values, executor=pool, readahead=5))
+        self.assertEqual(results, self.expected())
+        self.assertEqual(self.only_a.calls, 2)
+        self.assertEqual(self.a_and_b.calls, 6)
+
+    def test_lazy_inputs(self):
+        selected = Counted(self.b)
+        unselected = Counted(self.c)
+        switch = Switch(self.a, selected, unselected)
+        results = list(nf.sweep(switch, {self.a: [0], self.b: [1, 2], self.c: [3, 4]}))
+        self.assertEqual([result for _, result in results], [1, 1, 2, 2])
+        self.assertEqual(unselected.calls, 0)
+        self.assertEqual(selected.calls, 2)
+
+    def test_errors_are_raised(self):
+        root = Counted(Fail(self.a), self.b)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            with self.assertRaises(ValueError):
+                list(nf.sweep(root, {self.a: [1], self.b: [1, 2, 3]}, executor=pool))
+
+    def test_only_variables(self):
+        with self.assertRaises(TypeError):
+            Sweep(self.root, {self.static: [1]})
+
+
+if __name__ == '__main__':
+    unittest.main()
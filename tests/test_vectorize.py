@@ -0,0 +1,93 @@
+import unittest
+import warnings
+import numpy as np
+import nodeflow as nf
+from nodeflow import Operator, Constant, Variable, Cache, Switch, events, FallbackWarning
+
+
+class Clamp(Operator):
+    """not broadcast safe: branches on the value"""
+    def __init__(self, value):
+        super().__init__(value)
+        self.calls = 0
+
+    def __call__(self, value):
+        self.calls += 1
+        return value if value > 0 else 0
+
+
+class Vectorized(unittest.TestCase):
+    def setUp(self):
+        self.x = Variable(1)
+        self.root = nf.Divide(nf.Plus(self.x, Constant(1)), nf.Minus(Constant(10), self.x))
+
+    def sweep(self, root, values):
+        results = []
+        for value in values:
+            self.x.value = value
+            results.append(root.evaluate())
+        return np.array(results)
+
+    def test_same_results_as_a_loop(self):
+        values = np.arange(5)
+        result = self.root.evaluate_vectorized({self.x: values})
+        np.testing.assert_allclose(result, self.sweep(self.root, values))
+
+    def test_variable_is_not_assigned(self):
+        self.root.evaluate_vectorized({self.x: [1, 2]})
+        self.assertEqual(self.x.value, 1)
+
+    def test_fallback_is_reported(self):
+        clamp = Clamp(nf.Minus(self.x, Constant(2)))
+        root = nf.Plus(clamp, Constant(1))
+        reported = []
+        unsubscribe = events.subscribe(reported.append, events.Fallback)
+        try:
+            with self.assertWarns(FallbackWarning):
+                result = root.evaluate_vectorized({self.x: np.arange(4)})
+        finally:
+            unsubscribe()
+        np.testing.assert_array_equal(result, [1, 1, 1, 2])
+        self.assertEqual(clamp.calls, 4)
+        self.assertEqual([(e.node, e.size) for e in reported], [(clamp, 4)])
+
+    def test_broadcast_safe_operators_do_not_warn(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.root.evaluate_vectorized({self.x: np.arange(3)})
+
+    def test_independent_inputs_are_evaluated_once(self):
+        static = Clamp(Constant(3))
+        root = nf.Multiply(self.x, static)
+        np.testing.assert_array_equal(root.evaluate_vectorized({self.x: np.arange(3)}), [0, 3, 6])
+        self.assertEqual(static.calls, 1)
+        self.assertFalse(static.is_dirty())
+
+    def test_image_valued_inputs(self):
+        image = Constant(np.arange(4.0).reshape(2, 2))
+        root = nf.Plus(nf.Multiply(image, self.x), Constant(np.ones(2)))
+        result = root.evaluate_vectorized({self.x: [10, 100]})
+        self.assertEqual(result.shape, (2, 2, 2))
+        np.testing.assert_allclose(result, self.sweep(root, [10, 100]))
+
+    def test_lazy_inputs(self):
+        index = Variable(0)
+        expensive = Clamp(self.x)
+        switch = Switch(index, self.x, expensive)
+        with self.assertWarns(FallbackWarning):
+            result = switch.evaluate_vectorized({index: [0, 1, 0], self.x: [-1, -2, -3]})
+        np.testing.assert_array_equal(result, [-1, 0, -3])
+
+    def test_cache_passes_through(self):
+        np.testing.assert_array_equal(Cache(self.x).evaluate_vectorized({self.x: [1, 2]}), [1, 2])
+
+    def test_sizes(self):
+        y = Variable(0)
+        with self.assertRaises(ValueError):
+            nf.Plus(self.x, y).evaluate_vectorized({self.x: [1, 2], y: [1]})
+        with self.assertRaises(TypeError):
+            self.root.evaluate_vectorized({Constant(1): [1]})
+
+
+if __name__ == '__main__':
+    unittest.main()